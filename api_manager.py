@@ -1,73 +1,259 @@
-# api_manager.py
-import os
-import google.generativeai as genai
-from dotenv import load_dotenv, set_key
-
-class APIManager:
-    """Manages API authentication and model selection"""
-    
-    def __init__(self):
-        self.api_key = None
-        self.selected_model = 'gemini-2.0-flash'  # Default model
-        self.load_api_key_from_env()
-    
-    def load_api_key_from_env(self):
-        """Load API key from .env file if it exists"""
-        try:
-            load_dotenv()
-            self.api_key = os.getenv('GEMINI_API_KEY')
-            
-            # Configure genai if API key exists
-            if self.api_key:
-                self.configure_api()
-        except Exception as e:
-            print(f"Error loading API key: {str(e)}")
-    
-    def configure_api(self):
-        """Configure the Gemini API with current settings"""
-        genai.configure(api_key=self.api_key, transport="rest")
-    
-    def save_api_key(self, api_key):
-        """Save API key to environment and .env file"""
-        self.api_key = api_key
-        self.configure_api()
-        
-        try:
-            # Check if .env file exists
-            env_exists = os.path.exists('.env')
-            
-            # Create new file or update existing one
-            if not env_exists:
-                with open('.env', 'w') as f:
-                    f.write(f"GEMINI_API_KEY={api_key}\n")
-            else:
-                set_key('.env', 'GEMINI_API_KEY', api_key)
-            
-            return True, "Saved API key successfully"
-        except Exception as e:
-            return False, f"Error saving API key: {str(e)}"
-    
-    def set_model(self, model_name):
-        """Set the active model"""
-        self.selected_model = model_name
-    
-    def get_available_models(self):
-        """Get list of available models from API"""
-        if not self.api_key:
-            return False, "API key not configured", []
-            
-        try:
-            self.configure_api()
-            model_list = genai.list_models()
-            model_names = [model.name for model in model_list]
-            return True, "Models retrieved successfully", model_names
-        except Exception as e:
-            return False, f"Error retrieving models: {str(e)}", []
-    
-    def get_model(self):
-        """Get a configured GenerativeModel instance"""
-        if not self.api_key:
-            raise ValueError("API key not configured")
-        
-        return genai.GenerativeModel(model_name=self.selected_model)
-
+# api_manager.py
+import os
+import json
+import itertools
+import threading
+import time
+from dotenv import load_dotenv, set_key
+from response_cache import ResponseCache
+from rate_limiter import RateLimiter
+from single_flight import SingleFlight
+from metrics import metrics
+
+# google.generativeai takes most of a second to import, so it is loaded on first use
+genai = None
+
+def load_genai():
+    """Import google.generativeai once and return the module"""
+    global genai
+    if genai is None:
+        import google.generativeai
+        genai = google.generativeai
+    return genai
+
+class APIManager:
+    """Manages API authentication and model selection"""
+    
+    def __init__(self):
+        self.api_key = None
+        self.api_endpoint = None
+        self.selected_model = 'gemini-2.0-flash'  # Default model
+        self.cache = self.create_cache()
+        
+        # Ready-to-use model instances keyed by (model name, config)
+        self.models = {}
+        self.models_lock = threading.Lock()
+        self.configured_key = None
+        
+        # Identical prompts sent at the same time share one request
+        self.single_flight = SingleFlight('gemini')
+        
+        self.load_api_key_from_env()
+        
+        # Shared by every module, so chat, summaries and settings draw on one quota
+        self.rate_limiter = self.create_rate_limiter()
+    
+    def load_api_key_from_env(self):
+        """Load API key from .env file if it exists"""
+        try:
+            load_dotenv()
+            self.api_key = os.getenv('GEMINI_API_KEY')
+            # Alternative endpoint, e.g. http://127.0.0.1:8000 for the offline benchmarks
+            self.api_endpoint = os.getenv('GEMINI_API_ENDPOINT')
+            
+            # genai itself is configured on first use (see configure_api)
+        except Exception as e:
+            print(f"Error loading API key: {str(e)}")
+    
+    def create_cache(self):
+        """Open the on-disk response cache (None if the disk is unavailable)"""
+        try:
+            return ResponseCache()
+        except Exception as e:
+            print(f"Error opening response cache: {str(e)}")
+            return None
+    
+    def create_rate_limiter(self):
+        """Build the rate limiter; GEMINI_RPM / GEMINI_TPM set a budget for every model
+        
+        Without them nothing is throttled up front (quotas depend on the key's
+        tier) and quota errors are still retried with backoff.
+        """
+        rpm = os.getenv('GEMINI_RPM')
+        tpm = os.getenv('GEMINI_TPM')
+        limits = (float(rpm) if rpm else None, float(tpm) if tpm else None)
+        return RateLimiter(default_limits=limits)
+    
+    @staticmethod
+    def estimate_tokens(contents):
+        """Rough prompt size in tokens, for budgeting before the request is sent"""
+        return len(json.dumps(contents, ensure_ascii=False, default=str)) // 4 + 1
+    
+    def settle_usage(self, estimated_tokens, response):
+        """Correct the token budget with the usage the API reported"""
+        usage = getattr(response, 'usage_metadata', None)
+        total = getattr(usage, 'total_token_count', None)
+        
+        metrics.increment('gemini_prompt_tokens_total', getattr(usage, 'prompt_token_count', None) or 0)
+        metrics.increment('gemini_output_tokens_total', getattr(usage, 'candidates_token_count', None) or 0)
+        if total:
+            self.rate_limiter.settle(self.selected_model, estimated_tokens, total)
+    
+    def configure_api(self):
+        """Configure the Gemini API with current settings"""
+        # Reconfiguring drops genai's cached clients and their keep-alive
+        # HTTP sessions, so only do it when the key actually changes
+        with self.models_lock:
+            if self.api_key == self.configured_key:
+                return
+            
+            client_options = {"api_endpoint": self.api_endpoint} if self.api_endpoint else None
+            load_genai().configure(api_key=self.api_key, transport="rest", 
+                                   client_options=client_options)
+            self.configured_key = self.api_key
+            self.models.clear()
+    
+    def save_api_key(self, api_key):
+        """Save API key to environment and .env file"""
+        self.api_key = api_key
+        self.configure_api()
+        
+        try:
+            # Check if .env file exists
+            env_exists = os.path.exists('.env')
+            
+            # Create new file or update existing one
+            if not env_exists:
+                with open('.env', 'w') as f:
+                    f.write(f"GEMINI_API_KEY={api_key}\n")
+            else:
+                set_key('.env', 'GEMINI_API_KEY', api_key)
+            
+            return True, "Saved API key successfully"
+        except Exception as e:
+            return False, f"Error saving API key: {str(e)}"
+    
+    def set_model(self, model_name):
+        """Set the active model"""
+        if model_name != self.selected_model:
+            self.selected_model = model_name
+            with self.models_lock:
+                self.models.clear()
+    
+    def get_available_models(self):
+        """Get list of available models from API"""
+        if not self.api_key:
+            return False, "API key not configured", []
+            
+        try:
+            self.configure_api()
+            model_list = self.rate_limiter.call('models.list', 0, 
+                                                lambda: list(load_genai().list_models()))
+            model_names = [model.name for model in model_list]
+            return True, "Models retrieved successfully", model_names
+        except Exception as e:
+            return False, f"Error retrieving models: {str(e)}", []
+    
+    def get_model(self, generation_config=None):
+        """Get a configured GenerativeModel instance from the pool"""
+        if not self.api_key:
+            raise ValueError("API key not configured")
+        
+        self.configure_api()
+        
+        key = (self.selected_model, json.dumps(generation_config, sort_keys=True, default=str))
+        with self.models_lock:
+            model = self.models.get(key)
+            if model is None:
+                model = load_genai().GenerativeModel(model_name=self.selected_model, 
+                                                     generation_config=generation_config)
+                self.models[key] = model
+            return model
+    
+    def generate_text(self, contents, use_cache=True, cancel_event=None, **kwargs):
+        """Generate a complete response, served from the cache when possible
+        
+        Setting cancel_event stops waiting for quota with InterruptedError.
+        """
+        key = None
+        if use_cache and self.cache:
+            # Every request option is part of the identity, not just generation_config
+            key = ResponseCache.make_key(self.selected_model, contents, kwargs)
+            cached = self.cache.get(key)
+            if cached is not None:
+                metrics.increment('gemini_cache_hits_total')
+                return cached
+        
+        flight_key = key or ResponseCache.make_key(self.selected_model, contents, kwargs)
+        while True:
+            try:
+                return self.single_flight.do(flight_key, self.request_text, key, contents,
+                                             cancel_event, cancel_event=cancel_event, **kwargs)
+            except InterruptedError:
+                if cancel_event is not None and cancel_event.is_set():
+                    raise
+                # The shared request was cancelled by its own caller; send ours
+    
+    def request_text(self, key, contents, cancel_event=None, **kwargs):
+        """Send one generate request and cache the text under key (if given)"""
+        model = self.get_model(kwargs.pop('generation_config', None))
+        tokens = self.estimate_tokens(contents)
+        metrics.increment('gemini_requests_total', model=self.selected_model)
+        with metrics.timed('gemini_generate_seconds', model=self.selected_model):
+            response = self.rate_limiter.call(self.selected_model, tokens, 
+                                              model.generate_content, contents, 
+                                              cancel_event=cancel_event, **kwargs)
+            text = response.text
+        self.settle_usage(tokens, response)
+        
+        if key:
+            self.cache.set(key, text)
+        return text
+    
+    def generate_stream(self, contents, use_cache=True, cancel_event=None, **kwargs):
+        """Yield response text chunks as they arrive; a cache hit yields one chunk"""
+        key = None
+        if use_cache and self.cache:
+            # Every request option is part of the identity, not just generation_config
+            key = ResponseCache.make_key(self.selected_model, contents, kwargs)
+            cached = self.cache.get(key)
+            if cached is not None:
+                metrics.increment('gemini_cache_hits_total')
+                yield cached
+                return
+        
+        model = self.get_model(kwargs.pop('generation_config', None))
+        tokens = self.estimate_tokens(contents)
+        metrics.increment('gemini_requests_total', model=self.selected_model)
+        started = time.perf_counter()
+        
+        def open_stream():
+            response = model.generate_content(contents, stream=True, **kwargs)
+            # Quota errors surface with the first chunk; nothing has been shown yet,
+            # so this is the only point where a retry is invisible to the caller
+            chunks = iter(response)
+            first = next(chunks, None)
+            return response, chunks, first
+        
+        response, chunks, first = self.rate_limiter.call(self.selected_model, tokens, open_stream,
+                                                         cancel_event=cancel_event)
+        metrics.observe('gemini_first_token_seconds', time.perf_counter() - started, 
+                        model=self.selected_model)
+        if first is not None:
+            chunks = itertools.chain([first], chunks)
+        
+        parts = []
+        for chunk in chunks:
+            try:
+                text = chunk.text
+            except ValueError:
+                # Chunk without text parts (e.g. safety or finish metadata)
+                continue
+            
+            if text:
+                parts.append(text)
+                yield text
+        
+        metrics.observe('gemini_stream_seconds', time.perf_counter() - started, 
+                        model=self.selected_model)
+        self.settle_usage(tokens, response)
+        
+        # Only complete responses are cached; a closed generator never gets here
+        if key:
+            self.cache.set(key, "".join(parts))
+    
+    def warm_up(self):
+        """Import and configure the Gemini client ahead of the first request"""
+        load_genai()
+        if self.api_key:
+            self.configure_api()
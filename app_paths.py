@@ -0,0 +1,16 @@
+# app_paths.py
+import os
+
+def get_cache_dir(*parts):
+    """Return (and create) a directory under the application cache folder"""
+    base = os.getenv('AI_ASSISTANT_CACHE_DIR') or os.path.join(os.getcwd(), '.cache')
+    path = os.path.join(base, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def get_data_dir(*parts):
+    """Return (and create) a directory for user data that must not be evicted"""
+    base = os.getenv('AI_ASSISTANT_DATA_DIR') or os.path.join(os.getcwd(), 'data')
+    path = os.path.join(base, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
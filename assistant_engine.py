@@ -0,0 +1,183 @@
+# assistant_engine.py
+import threading
+import uuid
+from collections import OrderedDict
+from api_manager import APIManager
+from web_scraper import WebScraper
+from voice_manager import VoiceManager
+from summary_engine import SummaryEngine
+from batch_processor import BatchProcessor
+from context_manager import ConversationContext
+from audio_exporter import AudioExporter
+from text_segmenter import TextSegmenter
+from task_scheduler import TaskScheduler
+from metrics import metrics
+
+class ChatSession:
+    """Conversation state for a client that is not the chat tab (service, scripts)"""
+    
+    def __init__(self, session_id, context, messages=None, first_seq=0):
+        self.session_id = session_id
+        self.context = context
+        # Recent messages; messages[0] is message number first_seq of the session
+        self.messages = messages or []
+        self.first_seq = first_seq
+        # One turn at a time per conversation
+        self.lock = threading.Lock()
+
+
+class AssistantEngine:
+    """Summarize, chat and speech export logic shared by the GUI and the headless service"""
+    
+    # Conversations kept in memory; older ones are reloaded from the session store
+    MAX_CHAT_SESSIONS = 200
+    
+    def __init__(self, scheduler=None, api_manager=None, web_scraper=None, voice_manager=None,
+                 session_store=None, search_index=None):
+        self.scheduler = scheduler or TaskScheduler()
+        self.api_manager = api_manager or APIManager()
+        self.web_scraper = web_scraper or WebScraper()
+        self.voice_manager = voice_manager or VoiceManager()
+        self.session_store = session_store
+        self.search_index = search_index
+        
+        self.summary_engine = SummaryEngine(self.api_manager, scheduler=self.scheduler)
+        self.batch_processor = BatchProcessor(self.web_scraper, self.summary_engine, self.scheduler)
+        self.audio_exporter = AudioExporter(self.voice_manager)
+        
+        self.chat_sessions = OrderedDict()
+        self.sessions_lock = threading.Lock()
+    
+    # Summaries
+    
+    def load_source(self, source):
+        """Return (success, text) for a URL or for text given directly"""
+        if self.web_scraper.is_url(source):
+            return self.web_scraper.get_text_from_url(source)
+        return True, source
+    
+    def summarize_text(self, text, progress_callback=None):
+        """Generate summary using AI API"""
+        try:
+            if not self.api_manager.api_key:
+                return False, "Vui lòng cấu hình API key trước"
+            
+            with metrics.timed('summary_seconds'):
+                summary = self.summary_engine.summarize(text, progress_callback)
+            return True, summary
+        except Exception as e:
+            return False, f"Lỗi khi tóm tắt: {str(e)}"
+    
+    def summarize(self, source, progress_callback=None):
+        """Summarize a URL or a text, returning (success, summary or error)"""
+        success, text = self.load_source(source)
+        if not success:
+            return False, text
+        return self.summarize_text(text, progress_callback)
+    
+    def record_summary(self, summary, title):
+        """Make a summary searchable; title is the URL or first line of its input"""
+        if self.search_index:
+            self.search_index.add("summary", summary, title=title[:200])
+    
+    # Chat
+    
+    def new_context(self):
+        """Context builder for a new conversation"""
+        return ConversationContext(self.api_manager, self.scheduler)
+    
+    def build_chat_contents(self, history, message, context):
+        with metrics.timed('chat_build_context_seconds'):
+            return context.build_contents(history, message)
+    
+    def chat(self, history, message, context, cancel_event=None):
+        """Answer message given the earlier messages of the conversation"""
+        if not self.api_manager.api_key:
+            raise ValueError("API key not configured")
+        return self.api_manager.generate_text(self.build_chat_contents(history, message, context),
+                                              cancel_event=cancel_event)
+    
+    def chat_stream(self, history, message, context, cancel_event=None):
+        """Like chat, but yield the answer in chunks as they arrive"""
+        if not self.api_manager.api_key:
+            raise ValueError("API key not configured")
+        return self.api_manager.generate_stream(self.build_chat_contents(history, message, context),
+                                                cancel_event=cancel_event)
+    
+    def get_chat_session(self, session_id=None):
+        """Return a conversation by id (reloading it from disk if needed), or a new one
+        
+        Raises KeyError for an id that is neither in memory nor saved.
+        """
+        with self.sessions_lock:
+            if session_id in self.chat_sessions:
+                self.chat_sessions.move_to_end(session_id)
+                return self.chat_sessions[session_id]
+        
+        if session_id is None:
+            if self.session_store:
+                session_id = self.session_store.create_session()
+            else:
+                session_id = uuid.uuid4().hex
+            session = ChatSession(session_id, self.new_context())
+        else:
+            if not self.session_store:
+                raise KeyError(session_id)
+            self.session_store.flush()
+            messages, first_seq, total = self.session_store.load_tail(session_id)
+            if not total:
+                raise KeyError(session_id)
+            session = ChatSession(session_id, self.new_context(), messages, first_seq)
+        
+        with self.sessions_lock:
+            # Another request may have loaded it meanwhile
+            session = self.chat_sessions.setdefault(session_id, session)
+            self.chat_sessions.move_to_end(session_id)
+            while len(self.chat_sessions) > self.MAX_CHAT_SESSIONS:
+                self.chat_sessions.popitem(last=False)
+        return session
+    
+    def record_chat_message(self, session, role, content):
+        """Append a message to a conversation, saving and indexing it"""
+        message = {"role": role, "content": content}
+        seq = session.first_seq + len(session.messages)
+        session.messages.append(message)
+        
+        if self.session_store:
+            self.session_store.append_message(session.session_id, seq, message)
+        if self.search_index:
+            self.search_index.add("chat", content, ref=session.session_id)
+    
+    def chat_turn(self, session, message):
+        """Answer message in a conversation and record both sides"""
+        with session.lock:
+            reply = self.chat(session.messages, message, session.context)
+            self.record_chat_message(session, "user", message)
+            self.record_chat_message(session, "assistant", reply)
+            return reply
+    
+    def chat_turn_stream(self, session, message, cancel_event=None):
+        """Yield the answer to message in chunks; the turn is only recorded if it completes"""
+        with session.lock:
+            parts = []
+            stream = self.chat_stream(session.messages, message, session.context, cancel_event)
+            try:
+                for text in stream:
+                    if cancel_event is not None and cancel_event.is_set():
+                        return
+                    parts.append(text)
+                    yield text
+            finally:
+                stream.close()
+            
+            self.record_chat_message(session, "user", message)
+            self.record_chat_message(session, "assistant", "".join(parts))
+    
+    # Speech
+    
+    def export_speech(self, text, output_path, chunk_size=250, voice_id=None, rate=None,
+                      progress_callback=None, cancel_event=None):
+        """Render text to a WAV file at output_path"""
+        chunks = TextSegmenter(chunk_size).iter_chunks(text) if chunk_size else [text]
+        return self.audio_exporter.export(chunks, output_path, progress_callback, cancel_event,
+                                          voice_id=voice_id, rate=rate)
@@ -0,0 +1,148 @@
+# audio_exporter.py
+import hashlib
+import os
+import shutil
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from app_paths import get_cache_dir
+from cache_limiter import CacheLimiter
+from metrics import metrics
+
+def remove_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+# Engine owned by the current worker process, created on first use
+_worker_engine = None
+
+def render_chunk(text, voice_id, rate, path):
+    """Render one chunk to a WAV file (runs in a worker process)"""
+    global _worker_engine
+    if _worker_engine is None:
+        import pyttsx3
+        _worker_engine = pyttsx3.init()
+    
+    _worker_engine.setProperty('rate', rate)
+    if voice_id:
+        _worker_engine.setProperty('voice', voice_id)
+    
+    # Render next to the target and rename, so a crash never leaves a partial cache entry
+    tmp_path = path + f'.{os.getpid()}.tmp.wav'
+    try:
+        _worker_engine.save_to_file(text, tmp_path)
+        _worker_engine.runAndWait()
+        os.replace(tmp_path, path)
+    finally:
+        # Only left over if rendering failed
+        remove_file(tmp_path)
+    return path
+
+
+class AudioExporter:
+    """Renders text chunks to a single WAV file with parallel offline synthesis"""
+    
+    def __init__(self, voice_manager, max_workers=None, cache_dir=None,
+                 cache_max_bytes=500 * 1024 * 1024):
+        self.voice_manager = voice_manager
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.cache_dir = cache_dir or get_cache_dir('tts')
+        # Chunks and documents least recently exported are evicted first
+        self.cache_limiter = CacheLimiter(self.cache_dir, cache_max_bytes)
+    
+    @staticmethod
+    def cache_key(text, voice_id, rate):
+        """Hash text, voice and rate into a cache key"""
+        payload = f"{voice_id}\0{rate}\0{text}"
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def cache_path(self, key):
+        """Return the cached WAV path for a key"""
+        return os.path.join(self.cache_dir, key + '.wav')
+    
+    def export(self, chunks, output_path, progress_callback=None, cancel_event=None,
+               voice_id=None, rate=None):
+        """Render chunks and write them to output_path as one WAV file
+        
+        voice_id and rate default to the voice manager's current settings.
+        """
+        started = time.perf_counter()
+        chunks = [chunk for chunk in chunks if chunk.strip()]
+        if not chunks:
+            raise ValueError("Không có văn bản để xuất")
+        
+        voice_id = voice_id or self.voice_manager.current_voice_id
+        rate = rate or self.voice_manager.rate
+        
+        # Whole document rendered before with the same voice: just copy it
+        document_path = self.cache_path(self.cache_key("\n".join(chunks), voice_id, rate))
+        if os.path.exists(document_path):
+            metrics.increment('tts_export_cache_hits_total')
+            self.cache_limiter.touch(document_path)
+            shutil.copyfile(document_path, output_path)
+            if progress_callback:
+                progress_callback(len(chunks), len(chunks))
+            metrics.observe('tts_export_seconds', time.perf_counter() - started)
+            return output_path
+        
+        paths = [self.cache_path(self.cache_key(chunk, voice_id, rate)) for chunk in chunks]
+        missing = [i for i, path in enumerate(paths) if not os.path.exists(path)]
+        # Reused chunks become the newest entries, so eviction leaves them for this export
+        self.cache_limiter.touch(*paths)
+        done = len(chunks) - len(missing)
+        if progress_callback:
+            progress_callback(done, len(chunks))
+        
+        metrics.increment('tts_export_chunks_total', len(chunks))
+        metrics.increment('tts_export_rendered_chunks_total', len(missing))
+        
+        if missing:
+            # Each worker process owns its own engine, so chunks render in parallel
+            with ProcessPoolExecutor(max_workers=min(self.max_workers, len(missing))) as executor:
+                futures = [executor.submit(render_chunk, chunks[i], voice_id, rate, paths[i])
+                           for i in missing]
+                try:
+                    for future in as_completed(futures):
+                        future.result()
+                        done += 1
+                        if progress_callback:
+                            progress_callback(done, len(chunks))
+                        if cancel_event is not None and cancel_event.is_set():
+                            raise InterruptedError("Đã hủy xuất âm thanh")
+                except BaseException:
+                    for future in futures:
+                        future.cancel()
+                    raise
+        
+        self.concatenate_wavs(paths, document_path)
+        shutil.copyfile(document_path, output_path)
+        written = list(dict.fromkeys(paths[i] for i in missing)) + [document_path]
+        self.cache_limiter.added(sum(os.path.getsize(path) for path in written if os.path.exists(path)))
+        metrics.observe('tts_export_seconds', time.perf_counter() - started)
+        return output_path
+    
+    @staticmethod
+    def concatenate_wavs(paths, output_path):
+        """Join WAV files with identical formats into one file"""
+        tmp_path = output_path + '.tmp'
+        params = None
+        try:
+            with wave.open(tmp_path, 'wb') as output:
+                for path in paths:
+                    with wave.open(path, 'rb') as part:
+                        part_params = part.getparams()[:3]
+                        if params is None:
+                            params = part_params
+                            output.setnchannels(params[0])
+                            output.setsampwidth(params[1])
+                            output.setframerate(params[2])
+                        elif part_params != params:
+                            raise ValueError(f"Định dạng âm thanh không khớp: {path}")
+                        
+                        output.writeframes(part.readframes(part.getnframes()))
+            
+            os.replace(tmp_path, output_path)
+        finally:
+            remove_file(tmp_path)
@@ -0,0 +1,187 @@
+# batch_cli.py
+"""Summarize many URLs or files without a display
+
+    python -m batch_cli manifest.txt -o results.jsonl -j 4
+    cat urls.txt | python -m batch_cli - -o results.jsonl
+
+The manifest lists one URL or file path per line ('#' starts a comment);
+a directory summarizes its .txt files. Each finished item is appended to
+the output as one JSON line, so an interrupted run is resumed by running
+the same command again: items already summarized are skipped and items
+that failed are retried (unless --skip-failed). Each item has one record:
+a retried item's earlier failure is dropped from the file on resume.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from assistant_engine import AssistantEngine
+from batch_processor import BatchProcessor
+from task_scheduler import TaskScheduler
+
+class ResultWriter:
+    """Appends one JSON line per finished item and flushes it right away"""
+    
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = None
+        self.closed = False
+    
+    def load_done(self, retry_failed=True):
+        """Return the items already recorded (successful ones only, if retry_failed)
+        
+        Records of items about to be retried, and a partial last line left by
+        a crash mid-write, are removed so every item keeps a single record.
+        """
+        done = set()
+        if not os.path.exists(self.path):
+            return done
+        
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        
+        kept = []
+        for line in data.splitlines(keepends=True):
+            if not line.endswith(b"\n"):
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                kept.append(line)
+                continue
+            if record.get("ok") or not retry_failed:
+                done.add(record.get("item"))
+                kept.append(line)
+        
+        if len(kept) < len(data.splitlines()):
+            with open(self.path + '.tmp', 'wb') as f:
+                f.writelines(kept)
+            os.replace(self.path + '.tmp', self.path)
+        return done
+    
+    def open(self):
+        self.file = open(self.path, 'a', encoding='utf-8')
+    
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self.lock:
+            if self.closed:
+                return
+            self.file.write(line)
+            self.file.flush()
+    
+    def close(self):
+        with self.lock:
+            self.closed = True
+            if self.file:
+                self.file.close()
+
+
+def read_manifest(source):
+    """Items from a manifest file, stdin ('-') or a directory of .txt files"""
+    if source == '-':
+        return BatchProcessor.parse_items(sys.stdin.read())
+    if os.path.isdir(source):
+        return BatchProcessor.collect_files(source)
+    with open(source, 'r', encoding='utf-8') as f:
+        return BatchProcessor.parse_items(f.read())
+
+
+def positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="python -m batch_cli",
+                                     description="Summarize URLs and text files into a JSONL file")
+    parser.add_argument('manifest', nargs='?', default='-',
+                        help="file listing URLs/paths, a directory, or - for stdin (default)")
+    parser.add_argument('-o', '--output', required=True, help="JSONL file to append results to")
+    parser.add_argument('-j', '--jobs', type=positive_int, default=3,
+                        help="documents summarized at once")
+    parser.add_argument('--fetch-workers', type=positive_int, default=8,
+                        help="URLs/files loaded at once")
+    parser.add_argument('--model', help="Gemini model (default: the application's default)")
+    parser.add_argument('--skip-failed', action='store_true',
+                        help="on resume, don't retry items that failed before")
+    parser.add_argument('-q', '--quiet', action='store_true', help="don't print progress")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    options = parse_args(argv)
+    
+    try:
+        items = read_manifest(options.manifest)
+    except OSError as e:
+        print(f"Cannot read manifest: {str(e)}", file=sys.stderr)
+        return 2
+    
+    writer = ResultWriter(options.output)
+    done = writer.load_done(retry_failed=not options.skip_failed)
+    # Duplicates in the manifest are summarized once
+    pending = [item for item in dict.fromkeys(items) if item not in done]
+    if not options.quiet:
+        print(f"{len(items)} items, {len(set(items) & done)} already done, "
+              f"{len(pending)} to process", file=sys.stderr)
+    if not pending:
+        return 0
+    
+    scheduler = TaskScheduler(max_workers=max(8, options.fetch_workers + options.jobs),
+                              backend_limits={"web": options.fetch_workers,
+                                              "summarize": options.jobs})
+    engine = AssistantEngine(scheduler)
+    if not engine.api_manager.api_key:
+        print("GEMINI_API_KEY is not configured (.env or environment)", file=sys.stderr)
+        return 2
+    if options.model:
+        engine.api_manager.set_model(options.model)
+    
+    processor = engine.batch_processor
+    started = time.perf_counter()
+    counts = {"done": 0, "failed": 0}
+    counts_lock = threading.Lock()
+    
+    def on_result(index, item, success, result):
+        record = {"item": item, "ok": success, "finished": time.time()}
+        record["summary" if success else "error"] = result
+        writer.write(record)
+        
+        with counts_lock:
+            counts["done"] += 1
+            if not success:
+                counts["failed"] += 1
+            # Under the lock so lines from concurrent items never interleave
+            if not options.quiet:
+                status = "ok" if success else f"error: {result}"
+                print(f"[{counts['done']}/{len(pending)}] {item} ({status})", file=sys.stderr)
+    
+    cancel_event = threading.Event()
+    writer.open()
+    try:
+        processor.run(pending, on_result, cancel_event)
+    except KeyboardInterrupt:
+        # Summaries still running are abandoned (scheduler workers are daemon
+        # threads) and redone on resume
+        cancel_event.set()
+        print("Interrupted; run the same command again to resume", file=sys.stderr)
+        return 130
+    finally:
+        writer.close()
+        scheduler.shutdown()
+    
+    if not options.quiet:
+        elapsed = time.perf_counter() - started
+        print(f"Finished {counts['done']} items in {elapsed:.1f}s, {counts['failed']} failed",
+              file=sys.stderr)
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,92 @@
+# batch_processor.py
+import os
+import threading
+from task_scheduler import TaskScheduler
+
+class BatchProcessor:
+    """Summarizes many URLs or files with bounded concurrent fetching and summarizing"""
+    
+    def __init__(self, web_scraper, summary_engine, scheduler=None):
+        self.web_scraper = web_scraper
+        self.summary_engine = summary_engine
+        # Fetches run as "web" jobs and summaries as "summarize" jobs, so the
+        # scheduler's backend caps bound the batch
+        self.scheduler = scheduler or summary_engine.scheduler
+    
+    @staticmethod
+    def collect_files(directory, extensions=('.txt',)):
+        """List text files in a directory, sorted by name"""
+        files = []
+        for name in sorted(os.listdir(directory)):
+            path = os.path.join(directory, name)
+            if os.path.isfile(path) and name.lower().endswith(extensions):
+                files.append(path)
+        return files
+    
+    @staticmethod
+    def parse_items(text):
+        """Split multi-line input into batch items, skipping blanks and comments"""
+        items = []
+        for line in text.splitlines():
+            line = line.strip()
+            if line and not line.startswith('#'):
+                items.append(line)
+        return items
+    
+    def load_item(self, item):
+        """Fetch a URL or read a file, returning (success, text or error)"""
+        try:
+            if self.web_scraper.is_url(item):
+                return self.web_scraper.get_text_from_url(item)
+        except Exception as e:
+            return False, f"Lỗi khi tải: {str(e)}"
+        
+        try:
+            with open(item, 'r', encoding='utf-8') as file:
+                return True, file.read()
+        except Exception as e:
+            return False, f"Không thể đọc file: {str(e)}"
+    
+    def summarize_item(self, text, cancel_event):
+        """Summarize text (quota errors are already retried by the API manager)"""
+        try:
+            return True, self.summary_engine.summarize(text, cancel_event=cancel_event)
+        except Exception as e:
+            return False, f"Lỗi khi tóm tắt: {str(e)}"
+    
+    def run(self, items, on_result, cancel_event=None):
+        """Process items, calling on_result(index, item, success, result) as each completes
+        
+        on_result is called on the thread running this method. Cancelling
+        raises InterruptedError; no result is reported after that.
+        """
+        cancel_event = cancel_event or threading.Event()
+        jobs = []
+        sources = {}
+        
+        def submit(func, *args, backend):
+            job = self.scheduler.submit(func, *args, priority=TaskScheduler.PRIORITY_LOW,
+                                        backend=backend)
+            jobs.append(job)
+            return job
+        
+        def finished(job):
+            index, item = sources[job]
+            if job.state == job.CANCELLED:
+                return
+            if job.error is not None:
+                success, result = False, str(job.error)
+            else:
+                success, result = job.result
+            
+            if job.backend == "web" and success:
+                # Content is ready: queue it for the (smaller) summarize backend
+                summary_job = submit(self.summarize_item, result, cancel_event, backend="summarize")
+                sources[summary_job] = (index, item)
+            else:
+                on_result(index, item, success, result)
+        
+        for index, item in enumerate(items):
+            sources[submit(self.load_item, item, backend="web")] = (index, item)
+        
+        self.scheduler.wait(jobs, cancel_event, finished)
@@ -0,0 +1,148 @@
+# benchmarks/fake_gemini.py
+import json
+import random
+import re
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+class FakeGeminiServer:
+    """Local stand-in for the Gemini REST API with configurable latency, streaming and errors"""
+    
+    PATH_PATTERN = re.compile(r'^/v1beta/models/([^/:?]+):(generateContent|streamGenerateContent)')
+    
+    REPLY_WORDS = ("Văn bản trình bày các ý chính về hiệu năng, độ trễ và cách đo lường "
+                   "trong một ứng dụng trợ lý sử dụng mô hình ngôn ngữ lớn").split()
+    
+    def __init__(self, host='127.0.0.1', port=0, latency=0.05, chunk_delay=0.01, chunks=5,
+                 reply_words=60, error_rate=0.0, seed=None):
+        self.latency = latency
+        self.chunk_delay = chunk_delay
+        self.chunks = chunks
+        self.reply_words = reply_words
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        
+        # Request counters, read by the benchmark report
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        
+        self.server = ThreadingHTTPServer((host, port), self.make_handler())
+        self.server.daemon_threads = True
+        self.thread = None
+    
+    @property
+    def endpoint(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name="fake-gemini")
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+    
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+    
+    def should_fail(self):
+        with self.lock:
+            self.requests += 1
+            failed = self.random.random() < self.error_rate
+            if failed:
+                self.errors += 1
+            return failed
+    
+    def reply_text(self):
+        words = [self.REPLY_WORDS[i % len(self.REPLY_WORDS)] for i in range(self.reply_words)]
+        return " ".join(words) + "."
+    
+    @staticmethod
+    def response_body(text, prompt_tokens, output_tokens, finished):
+        body = {
+            "candidates": [{
+                "content": {"parts": [{"text": text}], "role": "model"},
+                "index": 0,
+            }],
+            "usageMetadata": {
+                "promptTokenCount": prompt_tokens,
+                "candidatesTokenCount": output_tokens,
+                "totalTokenCount": prompt_tokens + output_tokens,
+            },
+        }
+        if finished:
+            body["candidates"][0]["finishReason"] = "STOP"
+        return body
+    
+    def make_handler(self):
+        server = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            
+            def do_POST(self):
+                match = server.PATH_PATTERN.match(self.path)
+                length = int(self.headers.get('Content-Length', 0))
+                request = self.rfile.read(length)
+                if not match:
+                    self.send_json(404, {"error": {"code": 404, "message": "Not found",
+                                                   "status": "NOT_FOUND"}})
+                    return
+                
+                time.sleep(server.latency)
+                if server.should_fail():
+                    self.send_json(429, {"error": {
+                        "code": 429,
+                        "message": "Resource has been exhausted (e.g. check quota).",
+                        "status": "RESOURCE_EXHAUSTED",
+                    }})
+                    return
+                
+                prompt_tokens = len(request) // 4 + 1
+                text = server.reply_text()
+                output_tokens = len(text) // 4 + 1
+                if match.group(2) == "generateContent":
+                    self.send_json(200, server.response_body(text, prompt_tokens, output_tokens, True))
+                else:
+                    self.send_stream(text, prompt_tokens, output_tokens)
+            
+            def send_json(self, status, body):
+                data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=UTF-8')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+            
+            def send_stream(self, text, prompt_tokens, output_tokens):
+                """Stream a JSON array of responses, one element per chunk, like alt=json"""
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json; charset=UTF-8')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                
+                words = text.split()
+                count = max(1, min(server.chunks, len(words)))
+                size = -(-len(words) // count)
+                for i in range(count):
+                    part = " ".join(words[i * size:(i + 1) * size])
+                    if i:
+                        part = " " + part
+                        time.sleep(server.chunk_delay)
+                    last = i == count - 1
+                    element = json.dumps(server.response_body(part, prompt_tokens, output_tokens, last),
+                                         ensure_ascii=False)
+                    self.write_chunk(("[" if i == 0 else ",") + element + ("]" if last else ""))
+                self.write_chunk("")
+            
+            def write_chunk(self, text):
+                data = text.encode('utf-8')
+                self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+                self.wfile.flush()
+            
+            def log_message(self, format, *args):
+                pass
+        
+        return Handler
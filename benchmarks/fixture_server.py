@@ -0,0 +1,111 @@
+# benchmarks/fixture_server.py
+import hashlib
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+class FixtureServer:
+    """Local HTTP server serving generated article pages at /page/<n>, with ETag revalidation"""
+    
+    SENTENCES = (
+        "Trí tuệ nhân tạo đang thay đổi cách chúng ta làm việc và học tập mỗi ngày.",
+        "Các mô hình ngôn ngữ lớn có thể tóm tắt tài liệu dài chỉ trong vài giây.",
+        "Độ trễ mạng và hạn mức API thường là nút thắt lớn nhất của ứng dụng.",
+        "Bộ nhớ đệm giúp tránh gửi lại cùng một yêu cầu nhiều lần.",
+        "Người dùng cảm nhận tốc độ qua thời gian nhận được chữ đầu tiên.",
+        "Việc đo lường thường xuyên giúp phát hiện sớm những thay đổi làm chậm hệ thống.",
+    )
+    
+    def __init__(self, host='127.0.0.1', port=0, page_kb=20, latency=0.0):
+        self.page_kb = page_kb
+        self.latency = latency
+        self.pages = {}
+        self.lock = threading.Lock()
+        
+        self.server = ThreadingHTTPServer((host, port), self.make_handler())
+        self.server.daemon_threads = True
+        self.thread = None
+    
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    def url(self, number):
+        return f"{self.base_url}/page/{number}"
+    
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name="fixture-pages")
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+    
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+    
+    def build_page(self, number):
+        """Article-like HTML of about page_kb kilobytes, with navigation boilerplate"""
+        paragraphs = []
+        size = 0
+        index = number
+        while size < self.page_kb * 1024:
+            sentences = [self.SENTENCES[(index + i) % len(self.SENTENCES)] for i in range(4)]
+            paragraph = f"<p>{' '.join(sentences)}</p>"
+            paragraphs.append(paragraph)
+            size += len(paragraph.encode('utf-8'))
+            index += 1
+        
+        html = (f"<!DOCTYPE html><html><head><meta charset='utf-8'><title>Bài viết {number}</title>"
+                "<script>var tracking = true;</script></head><body>"
+                "<nav><a href='/'>Trang chủ</a> <a href='/tin-tuc'>Tin tức</a></nav>"
+                f"<article><h1>Bài viết số {number}</h1>{''.join(paragraphs)}</article>"
+                "<footer>Bản quyền thuộc về trang mẫu.</footer></body></html>")
+        body = html.encode('utf-8')
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        return body, etag
+    
+    def get_page(self, number):
+        with self.lock:
+            page = self.pages.get(number)
+            if page is None:
+                page = self.build_page(number)
+                self.pages[number] = page
+            return page
+    
+    def make_handler(self):
+        server = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            
+            def do_GET(self):
+                parts = self.path.strip('/').split('/')
+                if len(parts) != 2 or parts[0] != 'page' or not parts[1].isdigit():
+                    self.send_response(404)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                
+                if server.latency:
+                    time.sleep(server.latency)
+                
+                body, etag = server.get_page(int(parts[1]))
+                if self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('ETag', etag)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, format, *args):
+                pass
+        
+        return Handler
@@ -0,0 +1,335 @@
+# benchmarks/run_benchmarks.py
+"""Offline benchmarks for the summarizer, chat, web scraping and speech chunking code paths
+
+Everything runs against local servers (a fake Gemini REST API and a fixture
+page server), so no network access, API key or display is needed:
+
+    python -m benchmarks --quick
+    python -m benchmarks --error-rate 0.05 --json bench.json
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.fake_gemini import FakeGeminiServer
+from benchmarks.fixture_server import FixtureServer
+
+SCENARIOS = ("scrape", "summarize", "chat", "batch", "segment")
+
+def percentile(ordered, fraction):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class BenchmarkResult:
+    """Latencies and failures of one scenario"""
+    
+    def __init__(self, name):
+        self.name = name
+        self.latencies = []
+        self.errors = 0
+        self.elapsed = 0.0
+        self.lock = threading.Lock()
+    
+    def record(self, seconds, success=True):
+        with self.lock:
+            self.latencies.append(seconds)
+            if not success:
+                self.errors += 1
+    
+    def summary(self):
+        ordered = sorted(self.latencies)
+        count = len(ordered)
+        return {
+            "name": self.name,
+            "count": count,
+            "errors": self.errors,
+            "elapsed": self.elapsed,
+            "throughput": count / self.elapsed if self.elapsed else 0.0,
+            "p50_ms": percentile(ordered, 0.50) * 1000,
+            "p95_ms": percentile(ordered, 0.95) * 1000,
+            "p99_ms": percentile(ordered, 0.99) * 1000,
+        }
+
+
+def run_concurrent(result, func, items, workers):
+    """Call func(item) for every item on a pool; func returns whether it succeeded"""
+    def timed(item):
+        started = time.perf_counter()
+        try:
+            success = func(item)
+        except Exception as e:
+            print(f"{result.name} error: {str(e)}")
+            success = False
+        result.record(time.perf_counter() - started, success)
+    
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(timed, items))
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+def make_document(number, paragraphs):
+    """Distinct long text, so no two documents share a chunk prompt"""
+    sentences = FixtureServer.SENTENCES
+    return "\n\n".join(
+        f"Tài liệu {number}, đoạn {i + 1}. " +
+        " ".join(sentences[(number + i + j) % len(sentences)] for j in range(6))
+        for i in range(paragraphs))
+
+
+def bench_scrape(scraper, fixtures, options):
+    urls = [fixtures.url(n) for n in range(options.pages)]
+    load = lambda url: scraper.get_text_from_url(url)[0]
+    
+    cold = run_concurrent(BenchmarkResult("scrape_cold"), load, urls, options.workers)
+    # Second pass revalidates every cached page with a conditional GET (304)
+    warm = run_concurrent(BenchmarkResult("scrape_revalidate"), load, urls, options.workers)
+    return [cold, warm]
+
+
+def bench_summarize(api_manager, options):
+    from summary_engine import SummaryEngine
+    from task_scheduler import TaskScheduler
+    
+    scheduler = TaskScheduler()
+    engine = SummaryEngine(api_manager, scheduler=scheduler)
+    short_docs = [make_document(n, 3) for n in range(options.documents)]
+    # About 4 chunks each at the default chunk budget: map plus reduce calls
+    long_docs = [make_document(1000 + n, 130) for n in range(max(1, options.documents // 4))]
+    summarize = lambda text: bool(engine.summarize(text))
+    
+    short = run_concurrent(BenchmarkResult("summarize_short"), summarize, short_docs, options.workers)
+    long = run_concurrent(BenchmarkResult("summarize_long"), summarize, long_docs, options.workers)
+    scheduler.shutdown()
+    return [short, long]
+
+
+def bench_chat(api_manager, options):
+    from context_manager import ConversationContext
+    from task_scheduler import TaskScheduler
+    
+    scheduler = TaskScheduler()
+    turn_result = BenchmarkResult("chat_turn")
+    first_token = BenchmarkResult("chat_first_token")
+    
+    def session(number):
+        context = ConversationContext(api_manager, scheduler, max_tokens=options.context_tokens)
+        history = []
+        for turn in range(options.turns):
+            message = f"Phiên {number}, câu hỏi {turn + 1}: " + FixtureServer.SENTENCES[turn % 6]
+            started = time.perf_counter()
+            parts = []
+            try:
+                for text in api_manager.generate_stream(context.build_contents(history, message)):
+                    if not parts:
+                        first_token.record(time.perf_counter() - started)
+                    parts.append(text)
+                success = True
+            except Exception as e:
+                print(f"chat error: {str(e)}")
+                success = False
+            turn_result.record(time.perf_counter() - started, success)
+            
+            history.append({"role": "user", "content": message})
+            history.append({"role": "assistant", "content": "".join(parts), "excluded": not success})
+        return True
+    
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=options.sessions) as executor:
+        list(executor.map(session, range(options.sessions)))
+    turn_result.elapsed = first_token.elapsed = time.perf_counter() - started
+    
+    scheduler.shutdown()
+    return [turn_result, first_token]
+
+
+def bench_batch(scraper, api_manager, fixtures, options):
+    from batch_processor import BatchProcessor
+    from summary_engine import SummaryEngine
+    from task_scheduler import TaskScheduler
+    
+    scheduler = TaskScheduler()
+    processor = BatchProcessor(scraper, SummaryEngine(api_manager, scheduler=scheduler))
+    # Pages not fetched by the scrape scenario, so every item is a cold fetch
+    urls = [fixtures.url(10000 + n) for n in range(options.pages)]
+    result = BenchmarkResult("batch")
+    submitted = time.perf_counter()
+    
+    def on_result(index, item, success, text):
+        # Latency of an item is measured from the start of the batch
+        result.record(time.perf_counter() - submitted, success)
+    
+    processor.run(urls, on_result)
+    result.elapsed = time.perf_counter() - submitted
+    scheduler.shutdown()
+    return [result]
+
+
+def make_segment_text(size):
+    """About size characters of prose for the segmenter: abbreviations, ellipses,
+    line breaks and unpunctuated runs that have to be cut at word boundaries"""
+    sentences = FixtureServer.SENTENCES
+    extras = ("TP. Hồ Chí Minh và PGS. TS. Nguyễn Văn A đã đến... rồi đi!",
+              " ".join(["từ"] * 200),
+              "Dòng một\nDòng hai?")
+    parts = []
+    length = 0
+    number = 0
+    while length < size:
+        paragraph = " ".join(sentences[(number + j) % len(sentences)] for j in range(5))
+        paragraph += " " + extras[number % len(extras)]
+        parts.append(paragraph)
+        length += len(paragraph) + 2
+        number += 1
+    return "\n\n".join(parts)
+
+
+def bench_segment(options):
+    from text_segmenter import TextSegmenter
+    
+    text = make_segment_text(int(options.segment_mb * 1024 * 1024))
+    segmenter = TextSegmenter(250)
+    first_chunk = BenchmarkResult("segment_first_chunk")
+    full_pass = BenchmarkResult("segment_full_pass")
+    
+    started = time.perf_counter()
+    for _ in range(options.segment_passes):
+        # Time to first chunk is what speech waits for before it can start
+        pass_started = time.perf_counter()
+        chunks = segmenter.iter_chunks(text)
+        first = next(chunks, None)
+        first_chunk.record(time.perf_counter() - pass_started, first is not None)
+        
+        count = 1 + sum(1 for _ in chunks)
+        full_pass.record(time.perf_counter() - pass_started, count > 1)
+    first_chunk.elapsed = full_pass.elapsed = time.perf_counter() - started
+    return [first_chunk, full_pass]
+
+
+def create_api_manager(endpoint, use_cache):
+    from api_manager import APIManager
+    from rate_limiter import RateLimiter
+    
+    os.environ['GEMINI_API_KEY'] = 'benchmark'
+    os.environ['GEMINI_API_ENDPOINT'] = endpoint
+    api_manager = APIManager()
+    if not use_cache:
+        api_manager.cache = None
+    
+    # Quotas are not what is being measured; keep retries short as well
+    api_manager.rate_limiter = RateLimiter(base_delay=0.05, max_delay=0.5)
+    return api_manager
+
+
+def print_report(results, gemini, fixtures):
+    header = f"{'scenario':<20}{'ops':>6}{'errors':>8}{'wall s':>9}{'ops/s':>9}" \
+             f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    print(header)
+    print("-" * len(header))
+    for row in results:
+        print(f"{row['name']:<20}{row['count']:>6}{row['errors']:>8}{row['elapsed']:>9.2f}"
+              f"{row['throughput']:>9.1f}{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}")
+    print()
+    print(f"Fake Gemini: {gemini.requests} requests, {gemini.errors} injected errors; "
+          f"fixture server: {len(fixtures.pages)} distinct pages")
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__.splitlines()[0])
+    parser.add_argument('--scenarios', default=",".join(SCENARIOS),
+                        help="comma-separated subset of: " + ", ".join(SCENARIOS))
+    parser.add_argument('--quick', action='store_true', help="small workload for CI smoke runs")
+    parser.add_argument('--latency', type=float, default=0.05, help="fake Gemini time to first byte (s)")
+    parser.add_argument('--chunk-delay', type=float, default=0.01, help="delay between stream chunks (s)")
+    parser.add_argument('--chunks', type=int, default=5, help="chunks per streamed response")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument('--page-latency', type=float, default=0.0, help="fixture server delay per page (s)")
+    parser.add_argument('--page-kb', type=int, default=20, help="size of fixture pages")
+    parser.add_argument('--pages', type=int, default=50)
+    parser.add_argument('--documents', type=int, default=20)
+    parser.add_argument('--sessions', type=int, default=4)
+    parser.add_argument('--turns', type=int, default=15)
+    parser.add_argument('--context-tokens', type=int, default=1500,
+                        help="chat context budget; small values exercise summary folding")
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--segment-mb', type=float, default=8.0, help="size of the text the segmenter splits")
+    parser.add_argument('--segment-passes', type=int, default=5)
+    parser.add_argument('--use-cache', action='store_true', help="keep the response cache enabled")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', metavar='PATH', help="also write results and metrics as JSON")
+    options = parser.parse_args(argv)
+    
+    if options.quick:
+        options.pages = min(options.pages, 10)
+        options.documents = min(options.documents, 4)
+        options.sessions = min(options.sessions, 2)
+        options.turns = min(options.turns, 5)
+        options.segment_mb = min(options.segment_mb, 2.0)
+        options.segment_passes = min(options.segment_passes, 2)
+    return options
+
+
+def main(argv=None):
+    options = parse_args(argv)
+    scenarios = [name.strip() for name in options.scenarios.split(",") if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        print(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+        return 2
+    
+    gemini = FakeGeminiServer(latency=options.latency, chunk_delay=options.chunk_delay,
+                              chunks=options.chunks, error_rate=options.error_rate,
+                              seed=options.seed).start()
+    fixtures = FixtureServer(page_kb=options.page_kb, latency=options.page_latency).start()
+    
+    # Caches and user data go to a throwaway directory, never the real ones
+    with tempfile.TemporaryDirectory(prefix="assistant-bench-") as workdir:
+        os.environ['AI_ASSISTANT_CACHE_DIR'] = os.path.join(workdir, 'cache')
+        os.environ['AI_ASSISTANT_DATA_DIR'] = os.path.join(workdir, 'data')
+        
+        from metrics import metrics
+        from web_scraper import WebScraper
+        
+        metrics.reset()
+        api_manager = create_api_manager(gemini.endpoint, options.use_cache)
+        scraper = WebScraper()
+        api_manager.warm_up()
+        scraper.warm_up()
+        
+        results = []
+        try:
+            for name in scenarios:
+                if name == "scrape":
+                    results += bench_scrape(scraper, fixtures, options)
+                elif name == "summarize":
+                    results += bench_summarize(api_manager, options)
+                elif name == "chat":
+                    results += bench_chat(api_manager, options)
+                elif name == "batch":
+                    results += bench_batch(scraper, api_manager, fixtures, options)
+                elif name == "segment":
+                    results += bench_segment(options)
+        finally:
+            gemini.stop()
+            fixtures.stop()
+    
+    rows = [result.summary() for result in results]
+    print_report(rows, gemini, fixtures)
+    
+    if options.json:
+        with open(options.json, 'w', encoding='utf-8') as f:
+            json.dump({"results": rows, "metrics": metrics.snapshot(), "options": vars(options)},
+                      f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
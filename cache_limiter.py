@@ -0,0 +1,95 @@
+# cache_limiter.py
+import os
+import threading
+import time
+
+class CacheLimiter:
+    """Keeps a directory of cache files within a size and age budget, least recently used out first"""
+    
+    # Leftover temp files older than this (s) belong to no running write
+    STALE_TMP_SECONDS = 3600
+    
+    # After evicting, stop at this share of max_bytes so the next writes don't evict again
+    LOW_WATER = 0.9
+    
+    def __init__(self, path, max_bytes, max_age=None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        # Bytes in the directory; measured on first use, then kept up to date
+        self.total = None
+    
+    @staticmethod
+    def entry_name(name):
+        """Files of one entry share the name up to the first dot (<hash>.json, <hash>.html)"""
+        return name.split('.', 1)[0]
+    
+    def touch(self, *paths):
+        """Mark a cache entry as used; eviction goes by modification time"""
+        for path in paths:
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+    
+    def added(self, size):
+        """Account for size bytes just written, evicting if over budget"""
+        with self.lock:
+            if self.total is None:
+                self.prune()
+            else:
+                self.total += size
+                if self.total > self.max_bytes:
+                    self.prune()
+    
+    def prune(self):
+        """Delete expired entries, then the least recently used ones (caller holds the lock)"""
+        now = time.time()
+        entries = {}
+        try:
+            names = os.listdir(self.path)
+        except OSError:
+            self.total = 0
+            return
+        
+        for name in names:
+            path = os.path.join(self.path, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if '.tmp' in name:
+                # In-progress writes are never touched
+                if now - stat.st_mtime > self.STALE_TMP_SECONDS:
+                    self.remove([path])
+                continue
+            files, size, used = entries.get(self.entry_name(name), ([], 0, 0))
+            entries[self.entry_name(name)] = (files + [path], size + stat.st_size, max(used, stat.st_mtime))
+        
+        total = 0
+        kept = []
+        for files, size, used in entries.values():
+            if self.max_age and now - used > self.max_age:
+                self.remove(files)
+            else:
+                total += size
+                kept.append((used, size, files))
+        
+        if total > self.max_bytes:
+            kept.sort()
+            for used, size, files in kept:
+                if total <= self.max_bytes * self.LOW_WATER:
+                    break
+                self.remove(files)
+                total -= size
+        
+        self.total = total
+    
+    @staticmethod
+    def remove(paths):
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
@@ -1,198 +1,430 @@
-# chat_module.py
-import tkinter as tk
-from tkinter import ttk, scrolledtext
-import threading
-import time
-
-class ChatModule:
-    """Handles chat interface and conversation logic"""
-    
-    def __init__(self, parent_frame, api_manager, voice_manager, status_callback):
-        self.parent = parent_frame
-        self.api_manager = api_manager
-        self.voice_manager = voice_manager
-        self.update_status = status_callback
-        
-        # Chat history
-        self.chat_history = []
-        
-        # Create UI components
-        self.create_widgets()
-    
-    def create_widgets(self):
-        # Main chat container
-        self.chat_container = ttk.Frame(self.parent)
-        self.chat_container.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
-        
-        # Chat display area
-        chat_display_frame = ttk.LabelFrame(self.chat_container, text="Cuộc trò chuyện")
-        chat_display_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
-        
-        self.chat_display = scrolledtext.ScrolledText(chat_display_frame, wrap=tk.WORD)
-        self.chat_display.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
-        self.chat_display.config(state=tk.DISABLED)
-        
-        # Input area
-        input_frame = ttk.Frame(self.chat_container)
-        input_frame.pack(fill=tk.X, expand=False, padx=5, pady=5)
-        
-        self.chat_input = ttk.Entry(input_frame)
-        self.chat_input.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(5, 5))
-        self.chat_input.bind("<Return>", lambda e: self.send_message())
-        
-        # Chat buttons frame
-        buttons_frame = ttk.Frame(input_frame)
-        buttons_frame.pack(side=tk.RIGHT)
-        
-        self.send_btn = ttk.Button(buttons_frame, text="Gửi", command=self.send_message)
-        self.send_btn.pack(side=tk.LEFT, padx=5)
-        
-        self.voice_btn = ttk.Button(buttons_frame, text="Đọc phản hồi", 
-                                   command=self.read_last_response)
-        self.voice_btn.pack(side=tk.LEFT, padx=5)
-        
-        self.clear_btn = ttk.Button(buttons_frame, text="Xóa", command=self.clear_chat)
-        self.clear_btn.pack(side=tk.LEFT, padx=5)
-        
-        # Progress indicator
-        self.progress_frame = ttk.Frame(self.chat_container)
-        self.progress_frame.pack(fill=tk.X, padx=5, pady=5)
-        
-        self.progress_bar = ttk.Progressbar(self.progress_frame, mode="indeterminate")
-    
-    def append_message(self, message, sender):
-        """Add a message to the chat display"""
-        self.chat_display.config(state=tk.NORMAL)
-        
-        # Add spacing between messages
-        if self.chat_history:
-            self.chat_display.insert(tk.END, "\n\n")
-        
-        # Format differently based on sender
-        if sender == "user":
-            self.chat_display.insert(tk.END, "Bạn: ", "user_tag")
-            self.chat_history.append({"role": "user", "content": message})
-        else:
-            self.chat_display.insert(tk.END, "AI: ", "ai_tag")
-            self.chat_history.append({"role": "assistant", "content": message})
-        
-        # Add the message
-        self.chat_display.insert(tk.END, message)
-        
-        # Apply tags for styling
-        self.chat_display.tag_configure("user_tag", foreground="blue", font=("Arial", 10, "bold"))
-        self.chat_display.tag_configure("ai_tag", foreground="green", font=("Arial", 10, "bold"))
-        
-        # Scroll to bottom
-        self.chat_display.see(tk.END)
-        self.chat_display.config(state=tk.DISABLED)
-    
-    def send_message(self):
-        """Send user message to the AI and get response"""
-        message = self.chat_input.get().strip()
-        if not message:
-            return
-        
-        # Clear input field
-        self.chat_input.delete(0, tk.END)
-        
-        # Add user message to chat
-        self.append_message(message, "user")
-        
-        # Disable input during processing
-        self.chat_input.config(state=tk.DISABLED)
-        self.send_btn.config(state=tk.DISABLED)
-        
-        # Show progress
-        self.progress_bar.pack(fill=tk.X, expand=True)
-        self.progress_bar.start()
-        self.update_status("Đang xử lý...", "orange")
-        
-        # Process in background thread
-        def get_ai_response():
-            try:
-                response = self.query_model(message)
-                
-                # Schedule UI update on main thread
-                self.parent.after(0, lambda: self.handle_response(response))
-            except Exception as e:
-                self.parent.after(0, lambda: self.handle_error(str(e)))
-        
-        thread = threading.Thread(target=get_ai_response)
-        thread.daemon = True
-        thread.start()
-    
-    def query_model(self, message):
-        """Send query to the AI model"""
-        if not self.api_manager.api_key:
-            raise ValueError("API key not configured")
-        
-        model = self.api_manager.get_model()
-        
-        # Convert chat history to Gemini's expected format
-        formatted_history = []
-        for item in self.chat_history[-10:]:
-            if item["role"] == "user":
-                formatted_history.append({"role": "user", "parts": [{"text": item["content"]}]})
-            elif item["role"] == "assistant":
-                formatted_history.append({"role": "model", "parts": [{"text": item["content"]}]})
-        
-        # Add current message
-        formatted_history.append({"role": "user", "parts": [{"text": message}]})
-        
-        # Generate response
-        response = model.generate_content(formatted_history)
-        return response.text
-    
-    def handle_response(self, response):
-        """Process AI response and update UI"""
-        # Stop progress
-        self.progress_bar.stop()
-        self.progress_bar.pack_forget()
-        
-        # Add response to chat
-        self.append_message(response, "assistant")
-        
-        # Re-enable input
-        self.chat_input.config(state=tk.NORMAL)
-        self.send_btn.config(state=tk.NORMAL)
-        self.chat_input.focus()
-        
-        self.update_status("Sẵn sàng", "green")
-    
-    def handle_error(self, error_message):
-        """Handle API errors"""
-        # Stop progress
-        self.progress_bar.stop()
-        self.progress_bar.pack_forget()
-        
-        # Add error as system message
-        self.chat_display.config(state=tk.NORMAL)
-        self.chat_display.insert(tk.END, "\n\nHệ thống: Lỗi - " + error_message, "error_tag")
-        self.chat_display.tag_configure("error_tag", foreground="red", font=("Arial", 10, "italic"))
-        self.chat_display.see(tk.END)
-        self.chat_display.config(state=tk.DISABLED)
-        
-        # Re-enable input
-        self.chat_input.config(state=tk.NORMAL)
-        self.send_btn.config(state=tk.NORMAL)
-        
-        self.update_status("Lỗi", "red")
-    
-    def read_last_response(self):
-        """Read the last AI response using TTS"""
-        if not self.chat_history:
-            return
-            
-        # Find last assistant message
-        for message in reversed(self.chat_history):
-            if message["role"] == "assistant":
-                self.voice_manager.speak(message["content"])
-                break
-    
-    def clear_chat(self):
-        """Clear the chat history and display"""
-        self.chat_history = []
-        self.chat_display.config(state=tk.NORMAL)
-        self.chat_display.delete(1.0, tk.END)
-        self.chat_display.config(state=tk.DISABLED)
+# chat_module.py
+import tkinter as tk
+from tkinter import ttk, scrolledtext
+import threading
+import time
+import queue
+from chat_transcript import ChatTranscript, TranscriptView
+from assistant_engine import AssistantEngine
+from task_scheduler import TaskScheduler
+
+class ChatModule:
+    """Handles chat interface and conversation logic"""
+    
+    # How often (ms) streamed chunks are flushed into the chat display
+    STREAM_PUMP_INTERVAL_MS = 50
+    
+    def __init__(self, parent_frame, api_manager, voice_manager, status_callback, session_store=None,
+                 search_index=None, scheduler=None, engine=None):
+        self.parent = parent_frame
+        self.api_manager = api_manager
+        self.voice_manager = voice_manager
+        self.update_status = status_callback
+        self.scheduler = scheduler or TaskScheduler(parent_frame)
+        self.engine = engine or AssistantEngine(self.scheduler, api_manager, voice_manager=voice_manager,
+                                                session_store=session_store, search_index=search_index)
+        
+        # Chat history (also holds system notices, which are never sent to the model)
+        self.transcript = ChatTranscript()
+        self.context = self.engine.new_context()
+        
+        # Persistence: the session is created with its first message
+        self.session_store = session_store
+        self.search_index = search_index
+        self.session_id = None
+        self.session_ids = []
+        # Messages before this index are not sent to the model: they predate a loaded
+        # session, or their turns are already folded into the context summary
+        self.context_start = 0
+        
+        # Streaming state
+        self.stream_queue = queue.Queue()
+        self.stream_chunks = []
+        self.cancel_event = None
+        self.pending_turn_index = None
+        
+        # Create UI components
+        self.create_widgets()
+    
+    def create_widgets(self):
+        # Main chat container
+        self.chat_container = ttk.Frame(self.parent)
+        self.chat_container.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        
+        # Saved sessions
+        if self.session_store:
+            session_frame = ttk.Frame(self.chat_container)
+            session_frame.pack(fill=tk.X, padx=5)
+            
+            ttk.Label(session_frame, text="Phiên trò chuyện:").pack(side=tk.LEFT, padx=5)
+            self.session_var = tk.StringVar()
+            self.session_combo = ttk.Combobox(session_frame, textvariable=self.session_var, 
+                                              state="readonly", postcommand=self.refresh_sessions)
+            self.session_combo.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+            self.session_combo.bind("<<ComboboxSelected>>", self.on_session_selected)
+        
+        # Chat display area
+        chat_display_frame = ttk.LabelFrame(self.chat_container, text="Cuộc trò chuyện")
+        chat_display_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        
+        self.chat_display = scrolledtext.ScrolledText(chat_display_frame, wrap=tk.WORD)
+        self.chat_display.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.chat_display.config(state=tk.DISABLED)
+        self.transcript_view = TranscriptView(self.chat_display, self.transcript)
+        
+        # Input area
+        input_frame = ttk.Frame(self.chat_container)
+        input_frame.pack(fill=tk.X, expand=False, padx=5, pady=5)
+        
+        self.chat_input = ttk.Entry(input_frame)
+        self.chat_input.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(5, 5))
+        self.chat_input.bind("<Return>", lambda e: self.send_message())
+        
+        # Chat buttons frame
+        buttons_frame = ttk.Frame(input_frame)
+        buttons_frame.pack(side=tk.RIGHT)
+        
+        self.send_btn = ttk.Button(buttons_frame, text="Gửi", command=self.send_message)
+        self.send_btn.pack(side=tk.LEFT, padx=5)
+        
+        self.voice_btn = ttk.Button(buttons_frame, text="Đọc phản hồi", 
+                                   command=self.read_last_response)
+        self.voice_btn.pack(side=tk.LEFT, padx=5)
+        
+        self.clear_btn = ttk.Button(buttons_frame, text="Xóa", command=self.clear_chat)
+        self.clear_btn.pack(side=tk.LEFT, padx=5)
+        
+        self.stop_btn = ttk.Button(buttons_frame, text="Dừng", 
+                                  command=self.stop_stream, state=tk.DISABLED)
+        self.stop_btn.pack(side=tk.LEFT, padx=5)
+        
+        # Streaming option
+        self.stream_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(self.chat_container, text="Hiển thị phản hồi trực tiếp", 
+                       variable=self.stream_var).pack(anchor=tk.W, padx=5)
+        
+        # Progress indicator
+        self.progress_frame = ttk.Frame(self.chat_container)
+        self.progress_frame.pack(fill=tk.X, padx=5, pady=5)
+        
+        self.progress_bar = ttk.Progressbar(self.progress_frame, mode="indeterminate")
+    
+    @property
+    def chat_history(self):
+        return self.transcript.messages
+    
+    def append_message(self, message, sender):
+        """Add a message to the chat display"""
+        role = "user" if sender == "user" else "assistant"
+        self.transcript_view.append(self.add_message(role, message))
+    
+    def add_message(self, role, content, **extra):
+        """Append a message to the transcript and queue it for saving"""
+        index = self.transcript.append(role, content, **extra)
+        
+        if self.session_store:
+            if self.session_id is None:
+                self.session_id = self.session_store.create_session()
+                self.transcript.loader = self.session_loader(self.session_id)
+            self.session_store.append_message(self.session_id, index, self.transcript[index])
+        
+        if self.search_index and role != "system":
+            self.search_index.add("chat", content, ref=self.session_id or "")
+        return index
+    
+    def send_message(self):
+        """Send user message to the AI and get response"""
+        message = self.chat_input.get().strip()
+        if not message:
+            return
+        
+        # Clear input field
+        self.chat_input.delete(0, tk.END)
+        
+        # Add user message to chat
+        self.pending_turn_index = len(self.transcript)
+        self.append_message(message, "user")
+        
+        # Disable input during processing
+        self.chat_input.config(state=tk.DISABLED)
+        self.send_btn.config(state=tk.DISABLED)
+        
+        # Show progress
+        self.progress_bar.pack(fill=tk.X, expand=True)
+        self.progress_bar.start()
+        self.update_status("Đang xử lý...", "orange")
+        
+        if self.stream_var.get():
+            self.start_stream(message)
+            return
+        
+        # Process in the background; the reply is handled on the Tk thread
+        self.scheduler.submit(self.query_model, message, self.context_history(),
+                              priority=TaskScheduler.PRIORITY_HIGH, backend="gemini",
+                              on_success=self.handle_response, on_error=self.handle_error)
+    
+    def context_history(self):
+        """Messages the model may see before the new message"""
+        # The pending user turn is already in history; don't send it twice
+        end = len(self.transcript)
+        if self.pending_turn_index is not None:
+            end = self.pending_turn_index
+        return self.transcript.slice(self.context_start, end)
+    
+    def query_model(self, message, history):
+        """Send query to the AI model"""
+        return self.engine.chat(history, message, self.context)
+    
+    def query_model_stream(self, message, history, cancel_event):
+        """Send query to the AI model, yielding text chunks as they arrive"""
+        stream = self.engine.chat_stream(history, message, self.context, cancel_event)
+        try:
+            for text in stream:
+                if cancel_event.is_set():
+                    break
+                yield text
+        finally:
+            # Closing the stream abandons the HTTP response and skips caching
+            stream.close()
+    
+    def start_stream(self, message):
+        """Stream the AI response into the chat display"""
+        self.cancel_event = threading.Event()
+        self.stream_queue = queue.Queue()
+        self.stream_chunks = []
+        
+        self.stop_btn.config(state=tk.NORMAL)
+        self.clear_btn.config(state=tk.DISABLED)
+        
+        # Open the assistant message; chunks are appended after the label
+        self.transcript_view.begin_stream()
+        
+        # The history is read here: the transcript is only touched on the Tk thread
+        history = self.context_history()
+        
+        # Producer: the worker only touches the queue, never the widgets
+        def stream_response(cancel_event, chunk_queue):
+            try:
+                for text in self.query_model_stream(message, history, cancel_event):
+                    chunk_queue.put(("chunk", text))
+                
+                if cancel_event.is_set():
+                    chunk_queue.put(("cancelled", None))
+                else:
+                    chunk_queue.put(("done", None))
+            except Exception as e:
+                chunk_queue.put(("error", str(e)))
+        
+        # A stream stopped before it started still needs its "cancelled" outcome
+        chunk_queue = self.stream_queue
+        self.scheduler.submit(stream_response, self.cancel_event, chunk_queue,
+                              priority=TaskScheduler.PRIORITY_HIGH, backend="gemini",
+                              cancel_event=self.cancel_event,
+                              on_cancel=lambda: chunk_queue.put(("cancelled", None)))
+        
+        self.parent.after(self.STREAM_PUMP_INTERVAL_MS, self.pump_stream)
+    
+    def pump_stream(self):
+        """Flush queued chunks into the chat display in one batch"""
+        texts = []
+        outcome = None
+        
+        try:
+            while True:
+                kind, payload = self.stream_queue.get_nowait()
+                if kind == "chunk":
+                    texts.append(payload)
+                else:
+                    outcome = (kind, payload)
+                    break
+        except queue.Empty:
+            pass
+        
+        if texts:
+            # First token arrived; the progress bar is no longer needed
+            if not self.stream_chunks:
+                self.progress_bar.stop()
+                self.progress_bar.pack_forget()
+                self.update_status("Đang nhận phản hồi...", "orange")
+            
+            self.stream_chunks.extend(texts)
+            self.transcript_view.append_stream("".join(texts))
+        
+        if outcome is None:
+            self.parent.after(self.STREAM_PUMP_INTERVAL_MS, self.pump_stream)
+        else:
+            self.finish_stream(*outcome)
+    
+    def finish_stream(self, outcome, error_message):
+        """Commit the streamed reply to chat history and restore the UI"""
+        text = "".join(self.stream_chunks)
+        self.stream_chunks = []
+        self.cancel_event = None
+        
+        self.stop_btn.config(state=tk.DISABLED)
+        self.clear_btn.config(state=tk.NORMAL)
+        
+        if outcome == "done":
+            self.transcript_view.end_stream(self.add_message("assistant", text))
+            self.pending_turn_index = None
+            self.handle_response(None)
+        elif outcome == "cancelled" and text:
+            # Keep the partial answer the user has already seen
+            self.transcript_view.end_stream(self.add_message("assistant", text))
+            self.pending_turn_index = None
+            self.append_system_message("Đã dừng phản hồi", "info_tag")
+            self.reset_input("Đã dừng", "orange")
+        elif outcome == "cancelled":
+            self.transcript_view.end_stream(None)
+            self.rollback_pending_turn()
+            self.append_system_message("Đã dừng phản hồi", "info_tag")
+            self.reset_input("Đã dừng", "orange")
+        elif text:
+            # A half-written answer stays visible but is not sent back as context
+            self.transcript_view.end_stream(self.add_message("assistant", text))
+            self.handle_error(error_message)
+        else:
+            self.transcript_view.end_stream(None)
+            self.handle_error(error_message)
+    
+    def stop_stream(self):
+        """Cancel the response currently being streamed"""
+        if self.cancel_event:
+            self.cancel_event.set()
+            self.stop_btn.config(state=tk.DISABLED)
+            self.update_status("Đang dừng...", "orange")
+    
+    def rollback_pending_turn(self):
+        """Exclude the unanswered user turn so context keeps alternating roles"""
+        if self.pending_turn_index is not None:
+            self.transcript.exclude_from(self.pending_turn_index)
+            if self.session_store and self.session_id:
+                self.session_store.exclude_from(self.session_id, self.pending_turn_index)
+            self.pending_turn_index = None
+    
+    def append_system_message(self, message, tag):
+        """Add a system notice to the chat display; it is never sent to the model"""
+        self.transcript_view.append(self.add_message("system", message, tag=tag))
+    
+    def reset_input(self, status, color):
+        """Stop progress indication and re-enable the input controls"""
+        self.progress_bar.stop()
+        self.progress_bar.pack_forget()
+        
+        self.chat_input.config(state=tk.NORMAL)
+        self.send_btn.config(state=tk.NORMAL)
+        self.chat_input.focus()
+        
+        self.update_status(status, color)
+        self.trim_transcript()
+    
+    def trim_transcript(self):
+        """Release messages that are neither on screen nor needed for the model's context"""
+        if self.pending_turn_index is not None:
+            return
+        
+        # Turns folded into the context summary are no longer sent verbatim
+        self.context_start += self.context.release_summarized(self.context_history())
+        self.transcript.trim(min(self.transcript_view.first, self.context_start))
+    
+    def handle_response(self, response):
+        """Process AI response and update UI"""
+        # Add response to chat (streamed responses are already displayed)
+        if response is not None:
+            self.pending_turn_index = None
+            self.append_message(response, "assistant")
+        
+        self.reset_input("Sẵn sàng", "green")
+    
+    def handle_error(self, error_message):
+        """Handle API errors"""
+        self.rollback_pending_turn()
+        
+        # Add error as system message
+        self.append_system_message("Lỗi - " + error_message, "error_tag")
+        
+        self.reset_input("Lỗi", "red")
+    
+    def read_last_response(self):
+        """Read the last AI response using TTS"""
+        if not self.chat_history:
+            return
+            
+        # Find last assistant message
+        for message in reversed(self.chat_history):
+            if message["role"] == "assistant":
+                self.voice_manager.speak(message["content"])
+                break
+    
+    def clear_chat(self):
+        """Clear the chat history and display"""
+        self.transcript_view.reset()
+        self.transcript.clear()
+        self.context.reset()
+        self.context_start = 0
+        self.pending_turn_index = None
+        
+        # The cleared conversation stays on disk; the next message opens a new session
+        self.session_id = None
+        if self.session_store:
+            self.session_var.set("")
+    
+    def refresh_sessions(self):
+        """Fill the session list with the most recent saved sessions"""
+        try:
+            sessions = self.session_store.list_sessions()
+        except Exception as e:
+            print(f"Error listing sessions: {str(e)}")
+            sessions = []
+        
+        self.session_ids = [session[0] for session in sessions]
+        self.session_combo['values'] = [
+            f"{time.strftime('%d/%m %H:%M', time.localtime(updated))} - {title or '(trống)'} ({count})"
+            for _, title, updated, count in sessions
+        ]
+    
+    def on_session_selected(self, event):
+        """Open the session picked in the combobox"""
+        index = self.session_combo.current()
+        if 0 <= index < len(self.session_ids):
+            self.open_session(self.session_ids[index])
+    
+    def open_session(self, session_id):
+        """Load the tail of a saved session in the background and show it"""
+        if session_id == self.session_id:
+            return
+        if self.pending_turn_index is not None:
+            self.update_status("Đang chờ phản hồi, chưa thể mở phiên khác", "orange")
+            return
+        
+        self.update_status("Đang tải phiên trò chuyện...", "blue")
+        
+        def load():
+            # Messages still queued for this session must be on disk first
+            self.session_store.flush()
+            return self.session_store.load_tail(session_id)
+        
+        self.scheduler.submit(load, backend="local", key="open_session",
+                              on_success=lambda result: self.show_session(session_id, result[0], result[1]),
+                              on_error=lambda message: self.update_status(f"Lỗi tải phiên: {message}", "red"))
+    
+    def session_loader(self, session_id):
+        """Loader reading a saved session's messages back into the transcript"""
+        def load_range(start, end):
+            # Messages still queued for this session must be on disk first
+            self.session_store.flush()
+            return self.session_store.load_range(session_id, start, end)
+        return load_range
+    
+    def show_session(self, session_id, messages, first):
+        """Replace the conversation with a loaded session"""
+        if self.pending_turn_index is not None:
+            return
+        
+        self.transcript_view.reset()
+        self.transcript.load(messages, first, self.session_loader(session_id))
+        self.context.reset()
+        self.context_start = first
+        self.session_id = session_id
+        self.transcript_view.show_latest()
+        self.update_status("Sẵn sàng", "green")
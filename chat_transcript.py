@@ -0,0 +1,298 @@
+# chat_transcript.py
+import tkinter as tk
+
+class ChatTranscript:
+    """Conversation messages, kept separately from the widget that shows them"""
+    
+    # Messages fetched per call when older history is read back from disk
+    LOAD_PAGE_SIZE = 100
+    
+    def __init__(self):
+        # Each message: {"role": "user" | "assistant" | "system", "content": str, ...}
+        self.messages = []
+        
+        # Indices are absolute; messages before base are still on disk
+        self.base = 0
+        self.loader = None
+    
+    def __len__(self):
+        return self.base + len(self.messages)
+    
+    def __getitem__(self, index):
+        if index < self.base:
+            self.load_older(index)
+        return self.messages[index - self.base]
+    
+    def load_older(self, index):
+        """Read messages from disk so that index and everything after it is in memory"""
+        start = max(0, min(index, self.base - self.LOAD_PAGE_SIZE))
+        self.messages[:0] = self.loader(start, self.base)
+        self.base = start
+    
+    def slice(self, start, end):
+        """Return in-memory messages start..end-1 (absolute indices)"""
+        return self.messages[max(0, start - self.base):max(0, end - self.base)]
+    
+    def append(self, role, content, **extra):
+        """Add a message and return its index"""
+        message = {"role": role, "content": content}
+        message.update(extra)
+        self.messages.append(message)
+        return len(self) - 1
+    
+    def trim(self, keep_from):
+        """Drop in-memory messages before keep_from, if they can be read back from disk"""
+        if self.loader is None:
+            return
+        
+        # Drop whole pages so a long chat isn't trimmed on every turn
+        drop = min(keep_from, len(self)) - self.base
+        if drop >= self.LOAD_PAGE_SIZE:
+            del self.messages[:drop]
+            self.base += drop
+    
+    def exclude_from(self, index):
+        """Keep messages from index on screen but out of the model's context"""
+        for message in self.messages[max(0, index - self.base):]:
+            message["excluded"] = True
+    
+    def load(self, messages, base, loader):
+        """Replace the contents with the tail of a stored session"""
+        self.messages = messages
+        self.base = base
+        self.loader = loader
+    
+    def clear(self):
+        self.messages = []
+        self.base = 0
+        self.loader = None
+
+
+class TranscriptView:
+    """Renders a bounded window of a ChatTranscript into a Text widget"""
+    
+    # Most messages kept in the widget at once
+    WINDOW_SIZE = 150
+    
+    # Messages rendered or dropped per paging step
+    PAGE_SIZE = 50
+    
+    LABELS = {"user": ("Bạn: ", "user_tag"), "assistant": ("AI: ", "ai_tag")}
+    
+    def __init__(self, text_widget, transcript):
+        self.text = text_widget
+        self.transcript = transcript
+        
+        # Rendered messages are transcript[first:last]; each starts at mark "msg<index>"
+        self.first = 0
+        self.last = 0
+        self.stream_start = None
+        self.paging = False
+        
+        # Tags are configured once; re-configuring on every insert is not free
+        self.text.tag_configure("user_tag", foreground="blue", font=("Arial", 10, "bold"))
+        self.text.tag_configure("ai_tag", foreground="green", font=("Arial", 10, "bold"))
+        self.text.tag_configure("error_tag", foreground="red", font=("Arial", 10, "italic"))
+        self.text.tag_configure("info_tag", foreground="gray", font=("Arial", 10, "italic"))
+        
+        # Watch the scroll position to page messages in and out
+        self.scrollbar_set = self.text.vbar.set if hasattr(self.text, 'vbar') else None
+        self.text.config(yscrollcommand=self.on_scroll)
+    
+    def message_segments(self, message):
+        """Return the (text, tag) pieces that display a message"""
+        if message["role"] == "system":
+            return [("Hệ thống: " + message["content"], message.get("tag", "info_tag"))]
+        
+        label, tag = self.LABELS[message["role"]]
+        return [(label, tag), (message["content"], ())]
+    
+    def at_bottom(self):
+        return self.text.yview()[1] >= 0.999
+    
+    def append(self, index):
+        """Render transcript[index] below the messages already shown"""
+        if self.last < index:
+            # The newest messages are paged out; jump back to the end first
+            self.show_latest()
+            return
+        
+        follow = self.at_bottom()
+        self.text.config(state=tk.NORMAL)
+        self.insert_at_end(index, self.message_segments(self.transcript[index]))
+        self.last = index + 1
+        self.text.config(state=tk.DISABLED)
+        
+        if follow:
+            self.trim_top()
+            self.text.see(tk.END)
+    
+    def insert_at_end(self, index, segments):
+        if self.last > self.first or self.stream_start is not None:
+            self.text.insert(tk.END, "\n\n")
+        
+        start = self.text.index("end-1c")
+        for text, tag in segments:
+            self.text.insert(tk.END, text, tag)
+        self.set_mark(index, start)
+    
+    def set_mark(self, index, position):
+        name = f"msg{index}"
+        self.text.mark_set(name, position)
+        # Right gravity keeps the mark at its message when older text is prepended
+        self.text.mark_gravity(name, tk.RIGHT)
+    
+    def begin_stream(self):
+        """Open an assistant message whose text arrives in pieces"""
+        if self.last < len(self.transcript):
+            self.show_latest()
+        
+        self.text.config(state=tk.NORMAL)
+        if self.last > self.first:
+            self.text.insert(tk.END, "\n\n")
+        # A mark rather than an index, so messages prepended by load_older
+        # while the reply streams move it along; left gravity keeps it in
+        # front of the text inserted at its position
+        self.stream_start = "stream_start"
+        self.text.mark_set(self.stream_start, "end-1c")
+        self.text.mark_gravity(self.stream_start, tk.LEFT)
+        self.text.insert(tk.END, "AI: ", "ai_tag")
+        self.text.see(tk.END)
+        self.text.config(state=tk.DISABLED)
+    
+    def append_stream(self, text):
+        follow = self.at_bottom()
+        self.text.config(state=tk.NORMAL)
+        self.text.insert(tk.END, text)
+        self.text.config(state=tk.DISABLED)
+        if follow:
+            self.text.see(tk.END)
+    
+    def end_stream(self, index):
+        """Bind the streamed text to transcript[index], or remove it if index is None"""
+        if self.stream_start is None:
+            return
+        
+        self.text.config(state=tk.NORMAL)
+        if index is None:
+            # Nothing was received; drop the label and its separator
+            separator = "-2c" if self.last > self.first else ""
+            self.text.delete(f"{self.stream_start}{separator}", "end-1c")
+        else:
+            self.set_mark(index, self.stream_start)
+            self.last = index + 1
+        self.text.mark_unset(self.stream_start)
+        self.text.config(state=tk.DISABLED)
+        self.stream_start = None
+        
+        if index is not None and self.at_bottom():
+            self.trim_top()
+    
+    def trim_top(self):
+        """Drop the oldest rendered messages once the window is full"""
+        excess = (self.last - self.first) - self.WINDOW_SIZE
+        if excess <= 0:
+            return
+        
+        new_first = self.first + max(excess, self.PAGE_SIZE)
+        new_first = min(new_first, self.last - 1)
+        self.text.config(state=tk.NORMAL)
+        self.text.delete("1.0", f"msg{new_first}")
+        self.text.config(state=tk.DISABLED)
+        self.unset_marks(self.first, new_first)
+        self.first = new_first
+    
+    def trim_bottom(self):
+        """Drop the newest rendered messages while the user reads older ones"""
+        excess = (self.last - self.first) - self.WINDOW_SIZE
+        if excess <= 0 or self.stream_start is not None:
+            return
+        
+        new_last = max(self.last - max(excess, self.PAGE_SIZE), self.first + 1)
+        self.text.config(state=tk.NORMAL)
+        # Include the separator in front of the first dropped message
+        self.text.delete(f"msg{new_last}-2c", "end-1c")
+        self.text.config(state=tk.DISABLED)
+        self.unset_marks(new_last, self.last)
+        self.last = new_last
+    
+    def unset_marks(self, start, end):
+        for index in range(start, end):
+            self.text.mark_unset(f"msg{index}")
+    
+    def load_older(self):
+        """Render the page of messages just above the current window"""
+        self.paging = False
+        if self.first == 0:
+            return
+        
+        anchor = f"msg{self.first}"
+        new_first = max(0, self.first - self.PAGE_SIZE)
+        self.text.config(state=tk.NORMAL)
+        for index in range(self.first - 1, new_first - 1, -1):
+            # Prepend newest-first; each message lands on top of the previous one
+            self.text.insert("1.0", "\n\n")
+            for text, tag in reversed(self.message_segments(self.transcript[index])):
+                self.text.insert("1.0", text, tag)
+            self.set_mark(index, "1.0")
+        self.text.config(state=tk.DISABLED)
+        self.first = new_first
+        
+        self.text.yview(anchor)
+        self.trim_bottom()
+    
+    def load_newer(self):
+        """Render the page of messages just below the current window"""
+        self.paging = False
+        if self.last >= len(self.transcript):
+            return
+        
+        new_last = min(len(self.transcript), self.last + self.PAGE_SIZE)
+        self.text.config(state=tk.NORMAL)
+        for index in range(self.last, new_last):
+            self.insert_at_end(index, self.message_segments(self.transcript[index]))
+            self.last = index + 1
+        self.text.config(state=tk.DISABLED)
+        
+        # Keep the viewport where it was while dropping the oldest page
+        anchor = f"msg{self.last - 1}"
+        self.trim_top()
+        self.text.see(anchor)
+    
+    def show_latest(self):
+        """Re-render the newest window of messages and scroll to the end"""
+        self.reset()
+        self.first = max(0, len(self.transcript) - self.WINDOW_SIZE)
+        self.last = self.first
+        
+        self.text.config(state=tk.NORMAL)
+        for index in range(self.first, len(self.transcript)):
+            self.insert_at_end(index, self.message_segments(self.transcript[index]))
+            self.last = index + 1
+        self.text.see(tk.END)
+        self.text.config(state=tk.DISABLED)
+    
+    def reset(self):
+        """Clear the widget and forget what was rendered"""
+        self.text.config(state=tk.NORMAL)
+        self.text.delete("1.0", tk.END)
+        self.text.config(state=tk.DISABLED)
+        self.unset_marks(self.first, self.last)
+        self.first = self.last = 0
+        if self.stream_start is not None:
+            self.text.mark_unset(self.stream_start)
+            self.stream_start = None
+    
+    def on_scroll(self, top, bottom):
+        """Scrollbar callback: page messages in when either edge is reached"""
+        if self.scrollbar_set:
+            self.scrollbar_set(top, bottom)
+        
+        if self.paging:
+            return
+        if float(top) <= 0.0 and self.first > 0:
+            self.paging = True
+            self.text.after_idle(self.load_older)
+        elif float(bottom) >= 1.0 and self.last < len(self.transcript) and self.stream_start is None:
+            self.paging = True
+            self.text.after_idle(self.load_newer)
@@ -0,0 +1,183 @@
+# content_extractor.py
+import re
+
+class SoupAdapter:
+    """Node accessors for BeautifulSoup trees (lxml or html.parser)"""
+    
+    def __init__(self, html, parser):
+        from bs4 import BeautifulSoup
+        self.tree = BeautifulSoup(html, parser)
+    
+    def strip(self, tags):
+        for tag in self.tree(tags):
+            tag.decompose()
+    
+    def root(self):
+        return self.tree.body or self.tree
+    
+    def select(self, node, tags):
+        return node.find_all(tags)
+    
+    def parent(self, node):
+        return node.parent
+    
+    def key(self, node):
+        return id(node)
+    
+    def hints(self, node):
+        classes = node.get('class') or []
+        if isinstance(classes, str):
+            classes = [classes]
+        return ' '.join(classes) + ' ' + (node.get('id') or '')
+    
+    def text(self, node):
+        return ' '.join(node.stripped_strings)
+    
+    def find_fallback(self):
+        return (self.tree.find('main') or self.tree.find('article')
+                or self.tree.find('div', class_='content'))
+
+
+class SelectolaxAdapter:
+    """Node accessors for selectolax trees"""
+    
+    def __init__(self, html, parser_class):
+        self.tree = parser_class(html)
+    
+    def strip(self, tags):
+        self.tree.strip_tags(list(tags))
+    
+    def root(self):
+        return self.tree.body or self.tree.root
+    
+    def select(self, node, tags):
+        return node.css(', '.join(tags))
+    
+    def parent(self, node):
+        parent = node.parent
+        # The document node has no tag name worth scoring
+        if parent is None or not parent.tag or parent.tag.startswith('-'):
+            return None
+        return parent
+    
+    def key(self, node):
+        return node.mem_id
+    
+    def hints(self, node):
+        attributes = node.attributes
+        return (attributes.get('class') or '') + ' ' + (attributes.get('id') or '')
+    
+    def text(self, node):
+        return ' '.join(node.text(separator=' ', strip=True).split())
+    
+    def find_fallback(self):
+        return (self.tree.css_first('main') or self.tree.css_first('article')
+                or self.tree.css_first('div.content'))
+
+
+class ContentExtractor:
+    """Extracts the main readable text of an HTML page"""
+    
+    # Elements that never carry article text
+    BOILERPLATE_TAGS = ('script', 'style', 'noscript', 'template', 'svg', 'iframe',
+                        'nav', 'header', 'footer', 'aside', 'form', 'button')
+    
+    # Block elements whose text is scored and credited to their ancestors
+    PARAGRAPH_TAGS = ('p', 'pre', 'td', 'blockquote')
+    
+    POSITIVE_HINTS = re.compile(r'article|body|content|entry|main|page|post|text|story|blog', re.I)
+    NEGATIVE_HINTS = re.compile(r'comment|footer|footnote|sidebar|sponsor|advert|banner|menu|'
+                                r'nav|share|social|related|popup|cookie|breadcrumb|widget', re.I)
+    
+    MIN_PARAGRAPH_LENGTH = 25
+    
+    def __init__(self, backend=None):
+        self.backend = backend or self.detect_backend()
+    
+    def warm_up(self):
+        """Import the parser library ahead of the first page"""
+        self.create_adapter('<html><body><p>warm up</p></body></html>')
+    
+    @staticmethod
+    def detect_backend():
+        """Pick the fastest installed HTML parser"""
+        try:
+            import selectolax  # noqa: F401
+            return 'selectolax'
+        except ImportError:
+            pass
+        
+        try:
+            import lxml  # noqa: F401
+            return 'lxml'
+        except ImportError:
+            return 'html.parser'
+    
+    def create_adapter(self, html):
+        """Parse html with the configured backend"""
+        if self.backend == 'selectolax':
+            try:
+                from selectolax.lexbor import LexborHTMLParser as parser_class
+            except ImportError:
+                from selectolax.parser import HTMLParser as parser_class
+            return SelectolaxAdapter(html, parser_class)
+        
+        return SoupAdapter(html, self.backend)
+    
+    def class_weight(self, adapter, node):
+        """Score a node's class/id attributes (readability heuristic)"""
+        hints = adapter.hints(node)
+        weight = 0
+        if self.NEGATIVE_HINTS.search(hints):
+            weight -= 25
+        if self.POSITIVE_HINTS.search(hints):
+            weight += 25
+        return weight
+    
+    def find_main_node(self, adapter):
+        """Score paragraph containers and return the most article-like node"""
+        candidates = {}
+        
+        def credit(node, score):
+            key = adapter.key(node)
+            if key not in candidates:
+                candidates[key] = [node, self.class_weight(adapter, node)]
+            candidates[key][1] += score
+        
+        for paragraph in adapter.select(adapter.root(), self.PARAGRAPH_TAGS):
+            text = adapter.text(paragraph)
+            if len(text) < self.MIN_PARAGRAPH_LENGTH:
+                continue
+            
+            # Longer, comma-rich paragraphs look like prose
+            score = 1 + text.count(',') + min(len(text) // 100, 3)
+            
+            parent = adapter.parent(paragraph)
+            if parent is None:
+                continue
+            credit(parent, score)
+            
+            grandparent = adapter.parent(parent)
+            if grandparent is not None:
+                credit(grandparent, score / 2)
+        
+        best_node = None
+        best_score = 0
+        for node, score in candidates.values():
+            # Penalize link-heavy blocks such as menus and "related" lists
+            text_length = len(adapter.text(node)) or 1
+            link_length = sum(len(adapter.text(link)) for link in adapter.select(node, ('a',)))
+            score *= 1 - min(link_length / text_length, 1)
+            
+            if score > best_score:
+                best_node, best_score = node, score
+        
+        return best_node
+    
+    def extract(self, html):
+        """Return the main text of html (bytes or str), boilerplate removed"""
+        adapter = self.create_adapter(html)
+        adapter.strip(self.BOILERPLATE_TAGS)
+        
+        main_node = self.find_main_node(adapter) or adapter.find_fallback() or adapter.root()
+        return adapter.text(main_node)
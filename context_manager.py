@@ -0,0 +1,159 @@
+# context_manager.py
+import threading
+
+class ConversationContext:
+    """Builds token-budgeted chat requests, folding older turns into a rolling summary"""
+    
+    # Same local ratio as SummaryEngine; good enough to keep requests bounded
+    CHARS_PER_TOKEN = 4
+    
+    SUMMARY_PROMPT = """Dưới đây là bản tóm tắt cuộc trò chuyện đến nay (có thể trống) và các lượt trao đổi tiếp theo. Viết lại thành một bản tóm tắt ngắn gọn, giữ các thông tin, yêu cầu và kết luận quan trọng:
+
+Tóm tắt hiện tại:
+{summary}
+
+Các lượt tiếp theo:
+{turns}
+
+Tóm tắt mới:"""
+
+    SUMMARY_INTRO = "Tóm tắt phần trước của cuộc trò chuyện:\n{summary}"
+    SUMMARY_ACK = "Đã nắm được nội dung trước đó."
+    
+    def __init__(self, api_manager, scheduler, max_tokens=6000, summary_tokens=800):
+        self.api_manager = api_manager
+        self.scheduler = scheduler
+        self.max_tokens = max_tokens
+        self.summary_tokens = summary_tokens
+        
+        # Rolling summary of turns[:summarized_count]
+        self.summary = ""
+        self.summarized_count = 0
+        self.summarizing = False
+        self.generation = 0
+        self.lock = threading.Lock()
+    
+    def estimate_tokens(self, text):
+        """Estimate token count of text locally"""
+        return len(text) // self.CHARS_PER_TOKEN + 1
+    
+    @staticmethod
+    def context_turns(history):
+        """Messages that are sent to the model: answered user/assistant turns"""
+        return [item for item in history
+                if item["role"] in ("user", "assistant") and not item.get("excluded")]
+    
+    @staticmethod
+    def to_content(item):
+        role = "user" if item["role"] == "user" else "model"
+        return {"role": role, "parts": [{"text": item["content"]}]}
+    
+    def build_contents(self, history, message):
+        """Return Gemini contents for message: summary, recent turns verbatim, then message"""
+        turns = self.context_turns(history)
+        
+        with self.lock:
+            summary = self.summary
+            summarized_count = self.summarized_count
+        
+        budget = self.max_tokens - self.estimate_tokens(message)
+        if summary:
+            budget -= self.estimate_tokens(summary) + self.estimate_tokens(self.SUMMARY_ACK)
+        
+        # Walk back from the newest turn while the budget allows
+        start = len(turns)
+        while start > 0:
+            cost = self.estimate_tokens(turns[start - 1]["content"])
+            if cost > budget:
+                break
+            budget -= cost
+            start -= 1
+        
+        # Verbatim history must open with a user turn
+        while start < len(turns) and turns[start]["role"] != "user":
+            start += 1
+        
+        if summarized_count < start:
+            self.schedule_summary(turns[:start])
+        
+        contents = []
+        if summary:
+            contents.append({"role": "user", "parts": [{"text": self.SUMMARY_INTRO.format(summary=summary)}]})
+            contents.append({"role": "model", "parts": [{"text": self.SUMMARY_ACK}]})
+        
+        contents.extend(self.to_content(item) for item in turns[start:])
+        contents.append({"role": "user", "parts": [{"text": message}]})
+        return contents
+    
+    def schedule_summary(self, older_turns):
+        """Fold turns that fell out of the verbatim window into the summary, in the background"""
+        with self.lock:
+            if self.summarizing:
+                return
+            self.summarizing = True
+            generation = self.generation
+            summary = self.summary
+            
+            # Fold at most one request's worth of turns at a time
+            pending = []
+            cost = 0
+            for item in older_turns[self.summarized_count:]:
+                cost += self.estimate_tokens(item["content"])
+                if pending and cost > self.max_tokens:
+                    break
+                pending.append(item)
+        
+        def fold():
+            new_summary = None
+            try:
+                new_summary = self.summarize(summary, pending)
+            except Exception as e:
+                print(f"Context summary error: {str(e)}")
+            
+            with self.lock:
+                self.summarizing = False
+                # The conversation was cleared or replaced meanwhile
+                if generation != self.generation or new_summary is None:
+                    return
+                self.summary = new_summary
+                self.summarized_count += len(pending)
+        
+        # Low priority: it must never hold up the user's own requests
+        self.scheduler.submit(fold, priority=self.scheduler.PRIORITY_LOW, backend="gemini")
+    
+    def release_summarized(self, history):
+        """Forget the turns already folded into the summary
+        
+        history is what build_contents has been given; returns how many of its
+        leading items the caller drops from the history it passes from now on.
+        """
+        with self.lock:
+            released = 0
+            dropped = 0
+            for item in history:
+                if released == self.summarized_count:
+                    break
+                if item["role"] in ("user", "assistant") and not item.get("excluded"):
+                    released += 1
+                dropped += 1
+            # A fold still running adds its turns relative to this new start
+            self.summarized_count -= released
+        return dropped
+    
+    def summarize(self, summary, turns):
+        """Ask the model to merge turns into summary, trimmed to the summary budget"""
+        lines = []
+        for item in turns:
+            speaker = "Người dùng" if item["role"] == "user" else "Trợ lý"
+            lines.append(f"{speaker}: {item['content']}")
+        
+        prompt = self.SUMMARY_PROMPT.format(summary=summary or "(trống)", turns="\n\n".join(lines))
+        new_summary = self.api_manager.generate_text(prompt).strip()
+        return new_summary[:self.summary_tokens * self.CHARS_PER_TOKEN]
+    
+    def reset(self):
+        """Forget the summary, e.g. when the chat is cleared"""
+        with self.lock:
+            self.summary = ""
+            self.summarized_count = 0
+            self.generation += 1
@@ -0,0 +1,163 @@
+# metrics.py
+import bisect
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+class Counter:
+    """Monotonic counter"""
+    
+    kind = "counter"
+    
+    def __init__(self):
+        self.value = 0
+    
+    def increment(self, amount=1):
+        self.value += amount
+    
+    def snapshot(self):
+        return {"value": self.value}
+
+
+class Histogram:
+    """Bucketed distribution that also keeps recent samples for percentiles"""
+    
+    kind = "histogram"
+    
+    # Upper bounds in seconds, suited to latencies from 1 ms to 2 minutes
+    BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+    
+    # Recent samples kept for p50/p95
+    SAMPLE_SIZE = 1024
+    
+    def __init__(self, buckets=None):
+        self.buckets = buckets or self.BUCKETS
+        self.bucket_counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+        self.samples = []
+        self.next_sample = 0
+    
+    def observe(self, value):
+        self.bucket_counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        self.maximum = max(self.maximum, value)
+        
+        # Ring buffer of the most recent samples
+        if len(self.samples) < self.SAMPLE_SIZE:
+            self.samples.append(value)
+        else:
+            self.samples[self.next_sample] = value
+            self.next_sample = (self.next_sample + 1) % self.SAMPLE_SIZE
+    
+    @staticmethod
+    def percentile(ordered, fraction):
+        if not ordered:
+            return 0.0
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+    
+    def snapshot(self):
+        ordered = sorted(self.samples)
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "max": self.maximum,
+            "p50": self.percentile(ordered, 0.50),
+            "p95": self.percentile(ordered, 0.95),
+            "p99": self.percentile(ordered, 0.99),
+        }
+
+
+class MetricsRegistry:
+    """Thread-safe collection of named counters and histograms"""
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = {}
+    
+    @staticmethod
+    def make_key(name, labels):
+        return (name, tuple(sorted(labels.items())) if labels else ())
+    
+    def get(self, metric_class, name, labels):
+        """Return the metric for name and labels, creating it (caller holds the lock)"""
+        key = self.make_key(name, labels)
+        metric = self.metrics.get(key)
+        if metric is None:
+            metric = metric_class()
+            self.metrics[key] = metric
+        return metric
+    
+    def increment(self, name, amount=1, **labels):
+        with self.lock:
+            self.get(Counter, name, labels).increment(amount)
+    
+    def observe(self, name, value, **labels):
+        with self.lock:
+            self.get(Histogram, name, labels).observe(value)
+    
+    @contextmanager
+    def timed(self, name, **labels):
+        """Record the duration of the with-block in seconds, failures included"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+    
+    def snapshot(self):
+        """Return a list of {name, labels, type, ...values} dicts, sorted by name"""
+        with self.lock:
+            items = [(key, metric.kind, metric.snapshot()) for key, metric in self.metrics.items()]
+        
+        result = []
+        for (name, labels), kind, values in sorted(items, key=lambda item: item[0]):
+            entry = {"name": name, "labels": dict(labels), "type": kind}
+            entry.update(values)
+            result.append(entry)
+        return result
+    
+    def to_json(self):
+        return json.dumps(self.snapshot(), ensure_ascii=False, indent=2)
+    
+    @staticmethod
+    def format_labels(labels, extra=None):
+        pairs = list(labels) + ([extra] if extra else [])
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{key}="{value}"' for key, value in pairs) + "}"
+    
+    def to_prometheus(self):
+        """Render every metric in the Prometheus text exposition format"""
+        with self.lock:
+            items = sorted(self.metrics.items(), key=lambda item: item[0])
+            lines = []
+            declared = set()
+            for (name, labels), metric in items:
+                if name not in declared:
+                    lines.append(f"# TYPE {name} {metric.kind}")
+                    declared.add(name)
+                
+                if metric.kind == "counter":
+                    lines.append(f"{name}{self.format_labels(labels)} {metric.value}")
+                    continue
+                
+                cumulative = 0
+                for bound, count in zip(metric.buckets, metric.bucket_counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{self.format_labels(labels, ('le', bound))} {cumulative}")
+                lines.append(f"{name}_bucket{self.format_labels(labels, ('le', '+Inf'))} {metric.count}")
+                lines.append(f"{name}_sum{self.format_labels(labels)} {metric.total}")
+                lines.append(f"{name}_count{self.format_labels(labels)} {metric.count}")
+        return "\n".join(lines) + "\n"
+    
+    def reset(self):
+        with self.lock:
+            self.metrics.clear()
+
+
+# Process-wide registry used by every module
+metrics = MetricsRegistry()
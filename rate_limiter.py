@@ -0,0 +1,186 @@
+# rate_limiter.py
+import random
+import re
+import threading
+import time
+from metrics import metrics
+
+class TokenBucket:
+    """Classic token bucket; the balance may go negative to settle actual usage"""
+    
+    def __init__(self, capacity, per_second):
+        self.capacity = capacity
+        self.per_second = per_second
+        self.tokens = capacity
+        self.updated = time.monotonic()
+    
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.per_second)
+        self.updated = now
+    
+    def wait_time(self, amount, now):
+        """Seconds until amount can be taken (0 if it can be taken now)"""
+        self.refill(now)
+        # Requests larger than the bucket only wait for a full bucket
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.per_second
+    
+    def take(self, amount):
+        self.tokens -= amount
+
+
+class RateLimiter:
+    """Per-model RPM/TPM budgets with shared, jittered backoff on quota errors"""
+    
+    # Free-tier quotas as (requests per minute, tokens per minute), for reference
+    # and for callers that want them. Quotas depend on the key's tier, so none
+    # are applied unless given (see APIManager.create_rate_limiter); without a
+    # budget only the backoff on quota errors holds callers back.
+    FREE_TIER_LIMITS = {
+        'gemini-2.0-flash': (15, 1000000),
+        'gemini-2.0-flash-lite': (30, 1000000),
+        'gemini-1.5-flash': (15, 1000000),
+        'gemini-1.5-pro': (2, 32000),
+    }
+    
+    # HTTP statuses worth retrying: quota, overload and transient server errors
+    RETRYABLE_CODES = (429, 500, 502, 503, 504)
+    RETRYABLE_NAMES = ('ResourceExhausted', 'TooManyRequests', 'ServiceUnavailable',
+                       'InternalServerError', 'DeadlineExceeded', 'BadGateway', 'GatewayTimeout')
+    
+    RETRY_DELAY_PATTERN = re.compile(r'retry[_ ]?delay\W*(?:seconds\W*)?(\d+(?:\.\d+)?)', re.I)
+    
+    def __init__(self, limits=None, default_limits=None, max_retries=5, base_delay=1.0, max_delay=60.0):
+        # Either half of a (rpm, tpm) pair may be None for "no budget"
+        self.limits = dict(limits or {})
+        self.default_limits = default_limits or (None, None)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        
+        # Per model: request bucket, token bucket and a shared "paused until" time
+        self.buckets = {}
+        self.paused_until = {}
+        self.lock = threading.Lock()
+    
+    @staticmethod
+    def normalize_model(model_name):
+        return (model_name or '').split('/')[-1]
+    
+    def get_buckets(self, model_name):
+        """Return the (requests, tokens) buckets of a model, None where unlimited (caller holds the lock)"""
+        model_name = self.normalize_model(model_name)
+        buckets = self.buckets.get(model_name)
+        if buckets is None:
+            buckets = tuple(TokenBucket(limit, limit / 60.0) if limit else None
+                            for limit in self.limits.get(model_name, self.default_limits))
+            self.buckets[model_name] = buckets
+        return buckets
+    
+    def set_limits(self, model_name, rpm, tpm):
+        """Change a model's budget; takes effect for the next request"""
+        model_name = self.normalize_model(model_name)
+        with self.lock:
+            self.limits[model_name] = (rpm, tpm)
+            self.buckets.pop(model_name, None)
+    
+    def acquire(self, model_name, tokens, cancel_event=None):
+        """Block until one request of about `tokens` tokens fits in the model's budget
+        
+        Raises InterruptedError as soon as cancel_event is set.
+        """
+        key = self.normalize_model(model_name)
+        while True:
+            if cancel_event is not None and cancel_event.is_set():
+                raise InterruptedError("Request cancelled")
+            with self.lock:
+                now = time.monotonic()
+                requests, token_bucket = self.get_buckets(key)
+                wait = max(self.paused_until.get(key, 0) - now,
+                           requests.wait_time(1, now) if requests else 0.0,
+                           token_bucket.wait_time(tokens, now) if token_bucket else 0.0)
+                if wait <= 0:
+                    if requests:
+                        requests.take(1)
+                    if token_bucket:
+                        token_bucket.take(tokens)
+                    return
+            if cancel_event is not None:
+                cancel_event.wait(min(wait, 5.0))
+            else:
+                time.sleep(min(wait, 5.0))
+    
+    def settle(self, model_name, estimated_tokens, actual_tokens):
+        """Charge the difference between the estimate and the reported usage"""
+        if actual_tokens is None:
+            return
+        with self.lock:
+            token_bucket = self.get_buckets(model_name)[1]
+            if token_bucket:
+                token_bucket.take(actual_tokens - estimated_tokens)
+    
+    def pause(self, model_name, delay):
+        """Hold back every caller of a model for delay seconds"""
+        key = self.normalize_model(model_name)
+        with self.lock:
+            self.paused_until[key] = max(self.paused_until.get(key, 0), time.monotonic() + delay)
+    
+    def is_retryable(self, error):
+        """Check whether an API error is a quota/overload error worth retrying"""
+        # Classified by status code and exception type only; digits in the
+        # message text (a prompt, a URL) say nothing about the error
+        code = getattr(error, 'code', None)
+        if not isinstance(code, int):
+            # HTTP client errors carry the status on themselves or their response
+            code = getattr(error, 'status_code', None)
+            if code is None:
+                code = getattr(getattr(error, 'response', None), 'status_code', None)
+        if isinstance(code, int) and code in self.RETRYABLE_CODES:
+            return True
+        return type(error).__name__ in self.RETRYABLE_NAMES
+    
+    def retry_after(self, error):
+        """Server-suggested delay in seconds (Retry-After header or RetryInfo), if any"""
+        response = getattr(error, 'response', None)
+        headers = getattr(response, 'headers', None)
+        if headers:
+            value = headers.get('Retry-After')
+            if value:
+                try:
+                    return float(value)
+                except ValueError:
+                    pass
+        
+        match = self.RETRY_DELAY_PATTERN.search(str(error))
+        if match:
+            return float(match.group(1))
+        return None
+    
+    def backoff(self, attempt, error):
+        """Delay before retry number attempt (0-based)"""
+        suggested = self.retry_after(error)
+        if suggested is not None:
+            # Small jitter so paused callers don't all return at once
+            return min(suggested, self.max_delay) + random.uniform(0, 1)
+        # Full jitter exponential backoff
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+    
+    def call(self, model_name, tokens, func, *args, cancel_event=None, **kwargs):
+        """Run func within the model's budget, retrying retryable errors with backoff
+        
+        Waiting for the budget or a backoff ends with InterruptedError once
+        cancel_event is set.
+        """
+        for attempt in range(self.max_retries + 1):
+            with metrics.timed('rate_limit_wait_seconds'):
+                self.acquire(model_name, tokens, cancel_event)
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                if attempt == self.max_retries or not self.is_retryable(e):
+                    raise
+                metrics.increment('gemini_retries_total')
+                # Every caller of this model waits, not just this one
+                self.pause(model_name, self.backoff(attempt, e))
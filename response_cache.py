@@ -0,0 +1,112 @@
+# response_cache.py
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from app_paths import get_cache_dir
+
+class ResponseCache:
+    """Disk-backed, content-addressed LRU cache for model responses"""
+    
+    def __init__(self, path=None, max_entries=5000, max_bytes=50 * 1024 * 1024, ttl=7 * 24 * 3600):
+        self.path = path or os.path.join(get_cache_dir(), 'responses.sqlite')
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        
+        # Counters since startup
+        self.hits = 0
+        self.misses = 0
+        
+        # One shared connection, serialized by a lock (worker threads use it too)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            created REAL NOT NULL,
+            accessed REAL NOT NULL
+        )""")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed)")
+        self.conn.commit()
+    
+    @staticmethod
+    def make_key(model_name, contents, options=None):
+        """Hash model name, prompt and request options (generation_config, tools...) into a key"""
+        payload = json.dumps({
+            "model": model_name,
+            "contents": contents,
+            "options": options,
+        }, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def get(self, key):
+        """Return cached text for key, or None on miss"""
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+            
+            if row is None or (self.ttl and now - row[1] > self.ttl):
+                if row is not None:
+                    self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self.conn.commit()
+                self.misses += 1
+                return None
+            
+            self.conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self.conn.commit()
+            self.hits += 1
+            return row[0]
+    
+    def set(self, key, value):
+        """Store text for key and evict old entries if over budget"""
+        now = time.time()
+        size = len(value.encode('utf-8'))
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created, accessed) "
+                "VALUES (?, ?, ?, ?, ?)", (key, value, size, now, now))
+            self.evict()
+            self.conn.commit()
+    
+    def evict(self):
+        """Drop expired entries, then least recently used ones until within limits"""
+        if self.ttl:
+            self.conn.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.ttl,))
+        
+        count, total_size = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        
+        while count > self.max_entries or total_size > self.max_bytes:
+            # Remove in small batches to avoid one query per entry
+            batch = max(1, count - self.max_entries, count // 20)
+            self.conn.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY accessed LIMIT ?)", (batch,))
+            count, total_size = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+    
+    def clear(self):
+        """Remove every cached response"""
+        with self.lock:
+            self.conn.execute("DELETE FROM responses")
+            self.conn.commit()
+    
+    def stats(self):
+        """Return hit/miss counters and current cache size"""
+        with self.lock:
+            count, total_size = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": count,
+            "bytes": total_size,
+        }
@@ -0,0 +1,207 @@
+# search_index.py
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from app_paths import get_data_dir
+
+def build_fold_table():
+    """Map accented Latin letters (Vietnamese included) to lowercase ASCII, one char to one"""
+    table = {}
+    for code in range(0x80, 0x2000):
+        char = chr(code)
+        base = ''.join(c for c in unicodedata.normalize('NFD', char) if not unicodedata.combining(c))
+        base = base.lower()
+        if len(base) == 1 and base != char:
+            table[code] = base
+    # đ/Đ have no decomposition
+    table[ord('đ')] = 'd'
+    table[ord('Đ')] = 'd'
+    for code in range(ord('A'), ord('Z') + 1):
+        table[code] = chr(code).lower()
+    return table
+
+FOLD_TABLE = build_fold_table()
+
+def fold(text):
+    """Lowercase and strip diacritics; the result has the same length as text"""
+    return unicodedata.normalize('NFC', text).translate(FOLD_TABLE)
+
+
+class SearchIndex:
+    """Diacritic-insensitive full-text index (sqlite FTS5) over chats and summaries"""
+    
+    WORD_PATTERN = re.compile(r'\w+')
+    
+    # Characters of context shown around the first match
+    SNIPPET_LENGTH = 160
+    
+    # Newest matching documents considered for ranking
+    RANK_CANDIDATES = 2000
+    
+    def __init__(self, path=None):
+        self.path = path or os.path.join(get_data_dir(), 'search.sqlite')
+        
+        # Indexing happens on a writer thread; callers only enqueue
+        self.write_queue = queue.Queue()
+        self.writer = None
+        self.writer_lock = threading.Lock()
+        # Set if the writer could not open the index; documents are dropped from then on
+        self.writer_failed = False
+        
+        self.read_lock = threading.Lock()
+        self.read_conn = None
+    
+    def connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("""CREATE TABLE IF NOT EXISTS documents (
+            id INTEGER PRIMARY KEY,
+            kind TEXT NOT NULL,
+            ref TEXT NOT NULL DEFAULT '',
+            title TEXT NOT NULL DEFAULT '',
+            content TEXT NOT NULL,
+            created REAL NOT NULL
+        )""")
+        # Only folded text is indexed; originals are read from documents by rowid
+        conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5("
+                     "body, content='', tokenize='unicode61 remove_diacritics 2')")
+        conn.commit()
+        return conn
+    
+    def add(self, kind, content, ref='', title=''):
+        """Queue a document ('chat' message or 'summary') for indexing"""
+        if not content or not content.strip():
+            return
+        
+        item = (kind, ref, title, unicodedata.normalize('NFC', content), time.time())
+        with self.writer_lock:
+            if self.writer_failed:
+                return
+            if self.writer is None:
+                self.writer = threading.Thread(target=self.write_loop)
+                self.writer.daemon = True
+                self.writer.start()
+            self.write_queue.put(item)
+    
+    def write_loop(self):
+        """Index queued documents, one transaction per burst"""
+        try:
+            conn = self.connect()
+        except Exception as e:
+            print(f"Error opening search index, search history is not saved: {str(e)}")
+            with self.writer_lock:
+                self.writer_failed = True
+            # Nothing is queued after writer_failed is set: drop what is there
+            # and release flush() callers
+            while True:
+                try:
+                    item = self.write_queue.get_nowait()
+                except queue.Empty:
+                    return
+                if isinstance(item, threading.Event):
+                    item.set()
+                self.write_queue.task_done()
+        
+        while True:
+            batch = [self.write_queue.get()]
+            while True:
+                try:
+                    batch.append(self.write_queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            try:
+                for item in batch:
+                    if isinstance(item, threading.Event):
+                        continue
+                    kind, ref, title, content, created = item
+                    cursor = conn.execute(
+                        "INSERT INTO documents (kind, ref, title, content, created) VALUES (?, ?, ?, ?, ?)",
+                        (kind, ref, title, content, created))
+                    conn.execute("INSERT INTO documents_fts (rowid, body) VALUES (?, ?)",
+                                 (cursor.lastrowid, fold(title + "\n" + content)))
+                conn.commit()
+            except Exception as e:
+                print(f"Search index error: {str(e)}")
+            
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    item.set()
+                self.write_queue.task_done()
+    
+    def flush(self, timeout=None):
+        """Wait until every queued document is searchable; False if they never will be"""
+        done = threading.Event()
+        with self.writer_lock:
+            if self.writer_failed:
+                return False
+            if self.writer is None:
+                return True
+            self.write_queue.put(done)
+        return done.wait(timeout) and not self.writer_failed
+    
+    def build_query(self, query):
+        """Turn free text into an FTS5 query: every word, as a prefix"""
+        words = self.WORD_PATTERN.findall(fold(query))
+        return ' '.join(f'"{word}"*' for word in words), words
+    
+    def search(self, query, kind=None, limit=50):
+        """Return dicts (id, kind, ref, title, created, snippet) best match first"""
+        fts_query, words = self.build_query(query)
+        if not fts_query:
+            return []
+        
+        # Relevance is ranked among the newest matches only, so very common
+        # words cost the same as rare ones however large the index grows.
+        # The kind filter goes before that cut, or newer documents of other
+        # kinds could crowd out every match of the wanted kind.
+        candidates = ("SELECT documents_fts.rowid, documents_fts.rank FROM documents_fts "
+                      "JOIN documents k ON k.id = documents_fts.rowid "
+                      "WHERE documents_fts MATCH ? AND k.kind = ?" if kind else
+                      "SELECT rowid, rank FROM documents_fts WHERE documents_fts MATCH ?")
+        sql = ("SELECT d.id, d.kind, d.ref, d.title, d.content, d.created FROM "
+               f"({candidates} ORDER BY documents_fts.rowid DESC LIMIT ?) AS hits "
+               "JOIN documents d ON d.id = hits.rowid "
+               "ORDER BY hits.rank LIMIT ?")
+        params = [fts_query] + ([kind] if kind else []) + [self.RANK_CANDIDATES, limit]
+        
+        with self.read_lock:
+            if self.read_conn is None:
+                self.read_conn = self.connect()
+            rows = self.read_conn.execute(sql, params).fetchall()
+        
+        results = []
+        for doc_id, doc_kind, ref, title, content, created in rows:
+            results.append({
+                "id": doc_id,
+                "kind": doc_kind,
+                "ref": ref,
+                "title": title,
+                "content": content,
+                "created": created,
+                "snippet": self.snippet(content, words),
+            })
+        return results
+    
+    def snippet(self, content, words):
+        """Cut the original text around the first matched word"""
+        folded = fold(content)
+        positions = [folded.find(word) for word in words]
+        positions = [pos for pos in positions if pos >= 0]
+        start = max(0, min(positions) - self.SNIPPET_LENGTH // 4) if positions else 0
+        
+        text = " ".join(content[start:start + self.SNIPPET_LENGTH].split())
+        if start > 0:
+            text = "…" + text
+        if start + self.SNIPPET_LENGTH < len(content):
+            text += "…"
+        return text
+    
+    def close(self, timeout=2.0):
+        """Flush pending documents (best effort) before the application exits"""
+        self.flush(timeout)
@@ -0,0 +1,158 @@
+# search_module.py
+import tkinter as tk
+from tkinter import ttk, scrolledtext
+import time
+from task_scheduler import TaskScheduler
+
+class SearchModule:
+    """Handles searching past chats and summaries"""
+    
+    # Delay (ms) after the last keystroke before searching
+    SEARCH_DELAY_MS = 250
+    
+    KIND_FILTERS = {"Tất cả": None, "Trò chuyện": "chat", "Tóm tắt": "summary"}
+    KIND_LABELS = {"chat": "Trò chuyện", "summary": "Tóm tắt"}
+    
+    def __init__(self, parent_frame, search_index, status_callback, open_session_callback=None,
+                 scheduler=None):
+        self.parent = parent_frame
+        self.search_index = search_index
+        self.update_status = status_callback
+        self.open_session = open_session_callback
+        self.scheduler = scheduler or TaskScheduler(parent_frame)
+        
+        # Results of the latest search, by tree item id
+        self.results = {}
+        self.search_job = None
+        self.search_generation = 0
+        
+        # Create UI components
+        self.create_widgets()
+    
+    def create_widgets(self):
+        # Main search container
+        search_container = ttk.Frame(self.parent)
+        search_container.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        
+        # Query row
+        query_frame = ttk.Frame(search_container)
+        query_frame.pack(fill=tk.X, padx=5, pady=5)
+        
+        ttk.Label(query_frame, text="Tìm kiếm:").pack(side=tk.LEFT, padx=(0, 5))
+        self.query_entry = ttk.Entry(query_frame)
+        self.query_entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.query_entry.bind("<KeyRelease>", self.schedule_search)
+        self.query_entry.bind("<Return>", lambda e: self.run_search())
+        
+        self.kind_var = tk.StringVar(value="Tất cả")
+        kind_combo = ttk.Combobox(query_frame, textvariable=self.kind_var, state="readonly",
+                                  values=list(self.KIND_FILTERS), width=12)
+        kind_combo.pack(side=tk.LEFT, padx=5)
+        kind_combo.bind("<<ComboboxSelected>>", lambda e: self.run_search())
+        
+        ttk.Button(query_frame, text="Tìm", command=self.run_search).pack(side=tk.LEFT, padx=5)
+        
+        # Results list
+        results_frame = ttk.LabelFrame(search_container, text="Kết quả")
+        results_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        
+        self.results_tree = ttk.Treeview(results_frame, columns=("kind", "time", "snippet"),
+                                         show="headings", height=10)
+        self.results_tree.heading("kind", text="Loại")
+        self.results_tree.heading("time", text="Thời gian")
+        self.results_tree.heading("snippet", text="Nội dung")
+        self.results_tree.column("kind", width=90, stretch=False)
+        self.results_tree.column("time", width=110, stretch=False)
+        self.results_tree.column("snippet", width=500)
+        self.results_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(5, 0), pady=5)
+        self.results_tree.bind("<<TreeviewSelect>>", self.show_selected)
+        self.results_tree.bind("<Double-1>", self.open_selected)
+        
+        scrollbar = ttk.Scrollbar(results_frame, orient=tk.VERTICAL, command=self.results_tree.yview)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y, padx=(0, 5), pady=5)
+        self.results_tree.config(yscrollcommand=scrollbar.set)
+        
+        # Full text of the selected result
+        preview_frame = ttk.LabelFrame(search_container, text="Chi tiết")
+        preview_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        
+        self.preview_text = scrolledtext.ScrolledText(preview_frame, height=8, wrap=tk.WORD)
+        self.preview_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.preview_text.config(state=tk.DISABLED)
+    
+    def schedule_search(self, event=None):
+        """Search shortly after the user stops typing"""
+        if self.search_job:
+            self.parent.after_cancel(self.search_job)
+        self.search_job = self.parent.after(self.SEARCH_DELAY_MS, self.run_search)
+    
+    def run_search(self):
+        """Query the index in the background and show the results"""
+        self.search_job = None
+        query = self.query_entry.get().strip()
+        kind = self.KIND_FILTERS.get(self.kind_var.get())
+        
+        # Only the latest query's results are shown
+        self.search_generation += 1
+        generation = self.search_generation
+        
+        if not query:
+            self.show_results(generation, [], 0)
+            return
+        
+        def search():
+            started = time.perf_counter()
+            results = self.search_index.search(query, kind)
+            return results, (time.perf_counter() - started) * 1000
+        
+        # A query still waiting to run is replaced by the newer one
+        self.scheduler.submit(search, backend="local", key="search",
+                              on_success=lambda result: self.show_results(generation, *result),
+                              on_error=lambda message: self.update_status(f"Lỗi tìm kiếm: {message}", "red"))
+    
+    def show_results(self, generation, results, elapsed):
+        """Fill the results list unless a newer search has started"""
+        if generation != self.search_generation:
+            return
+        
+        self.results_tree.delete(*self.results_tree.get_children())
+        self.results = {}
+        for result in results:
+            item = self.results_tree.insert("", tk.END, values=(
+                self.KIND_LABELS.get(result["kind"], result["kind"]),
+                time.strftime('%d/%m/%Y %H:%M', time.localtime(result["created"])),
+                result["snippet"],
+            ))
+            self.results[item] = result
+        
+        self.set_preview("")
+        if results:
+            self.update_status(f"Tìm thấy {len(results)} kết quả ({elapsed:.0f} ms)", "green")
+    
+    def show_selected(self, event=None):
+        """Show the full text of the selected result"""
+        selection = self.results_tree.selection()
+        if not selection or selection[0] not in self.results:
+            return
+        
+        result = self.results[selection[0]]
+        text = result["content"]
+        if result["title"]:
+            text = result["title"] + "\n\n" + text
+        self.set_preview(text)
+    
+    def open_selected(self, event=None):
+        """Open the chat session a result belongs to"""
+        selection = self.results_tree.selection()
+        if not selection or selection[0] not in self.results:
+            return
+        
+        result = self.results[selection[0]]
+        if result["kind"] == "chat" and result["ref"] and self.open_session:
+            self.open_session(result["ref"])
+    
+    def set_preview(self, text):
+        self.preview_text.config(state=tk.NORMAL)
+        self.preview_text.delete(1.0, tk.END)
+        self.preview_text.insert(tk.END, text)
+        self.preview_text.config(state=tk.DISABLED)
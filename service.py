@@ -0,0 +1,397 @@
+# service.py
+"""Headless HTTP API over the assistant engine (no Tk needed)
+
+    python service.py --port 8765
+    
+    GET  /health
+    GET  /metrics               Prometheus text (?format=json for JSON)
+    POST /summarize             {"text": "..."} or {"url": "..."}
+    POST /chat                  {"message": "...", "session_id": optional, "stream": optional}
+    POST /tts/export            {"text": "...", "voice_id": optional, "rate": optional} -> audio/wav
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit, parse_qs
+from assistant_engine import AssistantEngine
+from session_store import SessionStore
+from search_index import SearchIndex
+from task_scheduler import TaskScheduler
+from metrics import metrics
+
+class HTTPError(Exception):
+    """Error answered to the client with a status code and a JSON message"""
+    
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class Request:
+    """A parsed HTTP request"""
+    
+    def __init__(self, method, target, version, headers, body):
+        parts = urlsplit(target)
+        self.method = method
+        self.path = parts.path
+        self.query = parse_qs(parts.query)
+        self.version = version
+        self.headers = headers
+        self.body = body
+    
+    @property
+    def keep_alive(self):
+        connection = self.headers.get('connection', '').lower()
+        if self.version == 'HTTP/1.0':
+            return connection == 'keep-alive'
+        return connection != 'close'
+    
+    def json(self):
+        try:
+            data = json.loads(self.body.decode('utf-8') or '{}')
+        except (UnicodeDecodeError, ValueError):
+            raise HTTPError(400, "Body must be a JSON object")
+        if not isinstance(data, dict):
+            raise HTTPError(400, "Body must be a JSON object")
+        return data
+
+
+class AssistantService:
+    """Asyncio HTTP server exposing summarize, chat and speech export for many clients"""
+    
+    REASONS = {
+        200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+        411: "Length Required", 413: "Payload Too Large", 431: "Request Header Fields Too Large",
+        500: "Internal Server Error", 502: "Bad Gateway", 503: "Service Unavailable",
+    }
+    
+    MAX_HEADER_BYTES = 64 * 1024
+    MAX_BODY_BYTES = 5 * 1024 * 1024
+    
+    # Idle keep-alive connections are closed after this many seconds
+    IDLE_TIMEOUT = 30
+    
+    def __init__(self, engine, host='127.0.0.1', port=8765):
+        self.engine = engine
+        self.host = host
+        self.port = port
+        self.server = None
+        self.routes = {
+            '/health': ('GET', self.handle_health),
+            '/metrics': ('GET', self.handle_metrics),
+            '/summarize': ('POST', self.handle_summarize),
+            '/chat': ('POST', self.handle_chat),
+            '/tts/export': ('POST', self.handle_tts_export),
+        }
+    
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle_connection, self.host, self.port,
+                                                 limit=self.MAX_HEADER_BYTES)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.server
+    
+    async def serve_forever(self):
+        if self.server is None:
+            await self.start()
+        print(f"Service listening on http://{self.host}:{self.port}")
+        async with self.server:
+            await self.server.serve_forever()
+    
+    # Connections
+    
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await self.read_request(reader)
+                except HTTPError as e:
+                    await self.send_json(writer, e.status, {"error": e.message}, False)
+                    break
+                if request is None:
+                    break
+                
+                keep_alive = await self.dispatch(request, writer)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+    
+    async def read_request(self, reader):
+        """Read one request, or return None when the client is done"""
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), self.IDLE_TIMEOUT)
+        except asyncio.TimeoutError:
+            return None
+        except asyncio.IncompleteReadError as e:
+            if e.partial.strip():
+                raise HTTPError(400, "Incomplete request")
+            return None
+        except asyncio.LimitOverrunError:
+            raise HTTPError(431, "Request headers too large")
+        
+        lines = head.decode('latin-1').split("\r\n")
+        try:
+            method, target, version = lines[0].split(" ", 2)
+        except ValueError:
+            raise HTTPError(400, "Malformed request line")
+        
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+        
+        if 'transfer-encoding' in headers:
+            raise HTTPError(411, "Send a Content-Length instead of a chunked body")
+        try:
+            length = int(headers.get('content-length', 0))
+        except ValueError:
+            raise HTTPError(400, "Invalid Content-Length")
+        if length < 0:
+            raise HTTPError(400, "Invalid Content-Length")
+        if length > self.MAX_BODY_BYTES:
+            raise HTTPError(413, "Request body too large")
+        
+        body = await reader.readexactly(length) if length else b""
+        return Request(method.upper(), target, version, headers, body)
+    
+    async def dispatch(self, request, writer):
+        """Answer one request; return whether the connection stays open"""
+        started = time.perf_counter()
+        route = self.routes.get(request.path)
+        path = request.path if route else "other"
+        keep_alive = request.keep_alive
+        
+        try:
+            if route is None:
+                raise HTTPError(404, "Not found")
+            method, handler = route
+            if request.method != method:
+                raise HTTPError(405, f"Use {method}")
+            
+            response = await handler(request, writer, keep_alive)
+            status = 200
+            if response is not None:
+                status, content_type, body = response
+                await self.send_response(writer, status, content_type, body, keep_alive)
+        except HTTPError as e:
+            status = e.status
+            await self.send_json(writer, e.status, {"error": e.message}, keep_alive)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            raise
+        except Exception as e:
+            status = 500
+            print(f"Service error: {str(e)}")
+            await self.send_json(writer, 500, {"error": str(e)}, keep_alive)
+        
+        metrics.increment('service_requests_total', path=path, status=str(status))
+        metrics.observe('service_request_seconds', time.perf_counter() - started, path=path)
+        return keep_alive
+    
+    async def send_response(self, writer, status, content_type, body, keep_alive):
+        head = (f"HTTP/1.1 {status} {self.REASONS.get(status, '')}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+    
+    async def send_json(self, writer, status, data, keep_alive):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        await self.send_response(writer, status, 'application/json; charset=utf-8', body, keep_alive)
+    
+    @staticmethod
+    def json_response(data, status=200):
+        return status, 'application/json; charset=utf-8', json.dumps(data, ensure_ascii=False).encode('utf-8')
+    
+    # Engine calls run on the shared scheduler, never on the event loop
+    
+    def run_job(self, func, *args, backend=None, error_status=502, cancel_event=None):
+        """Submit func to the scheduler and return an asyncio future for its result"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        
+        def resolve(setter, value):
+            if not future.done():
+                setter(value)
+        
+        self.engine.scheduler.submit(
+            func, *args, backend=backend, cancel_event=cancel_event,
+            on_success=lambda result: loop.call_soon_threadsafe(resolve, future.set_result, result),
+            on_error=lambda message: loop.call_soon_threadsafe(
+                resolve, future.set_exception, HTTPError(error_status, message)),
+            on_cancel=lambda: loop.call_soon_threadsafe(
+                resolve, future.set_exception, HTTPError(503, "Request cancelled")))
+        return future
+    
+    def require_api_key(self):
+        if not self.engine.api_manager.api_key:
+            raise HTTPError(503, "API key not configured")
+    
+    # Handlers
+    
+    async def handle_health(self, request, writer, keep_alive):
+        return self.json_response({
+            "status": "ok",
+            "api_key_configured": bool(self.engine.api_manager.api_key),
+            "model": self.engine.api_manager.selected_model,
+        })
+    
+    async def handle_metrics(self, request, writer, keep_alive):
+        if request.query.get('format') == ['json']:
+            return 200, 'application/json; charset=utf-8', metrics.to_json().encode('utf-8')
+        return 200, 'text/plain; version=0.0.4; charset=utf-8', metrics.to_prometheus().encode('utf-8')
+    
+    async def handle_summarize(self, request, writer, keep_alive):
+        data = request.json()
+        source = data.get('url') or data.get('text')
+        if not isinstance(source, str) or not source.strip():
+            raise HTTPError(400, "Provide 'text' or 'url'")
+        if data.get('url') and not self.engine.web_scraper.is_url(source):
+            raise HTTPError(400, "Invalid URL")
+        self.require_api_key()
+        source = source.strip()
+        
+        def summarize():
+            success, result = self.engine.summarize(source)
+            if success:
+                # Indexing writes to sqlite, so it stays off the event loop
+                self.engine.record_summary(result, source.splitlines()[0])
+            return success, result
+        
+        success, result = await self.run_job(summarize, backend="summarize")
+        if not success:
+            raise HTTPError(502, result)
+        return self.json_response({"summary": result})
+    
+    async def handle_chat(self, request, writer, keep_alive):
+        data = request.json()
+        message = data.get('message')
+        if not isinstance(message, str) or not message.strip():
+            raise HTTPError(400, "Provide 'message'")
+        self.require_api_key()
+        
+        try:
+            session = await self.run_job(self.engine.get_chat_session, data.get('session_id'),
+                                         backend="local", error_status=404)
+        except HTTPError as e:
+            if e.status == 404:
+                raise HTTPError(404, "Unknown session_id")
+            raise
+        
+        if data.get('stream'):
+            await self.stream_chat(writer, session, message.strip(), keep_alive)
+            return None
+        
+        reply = await self.run_job(self.engine.chat_turn, session, message.strip(), backend="gemini")
+        return self.json_response({"session_id": session.session_id, "reply": reply})
+    
+    async def stream_chat(self, writer, session, message, keep_alive):
+        """Answer as chunked JSON lines: {"text": ...} per chunk, then {"done": ..} or {"error": ..}"""
+        loop = asyncio.get_running_loop()
+        events = asyncio.Queue()
+        cancel_event = threading.Event()
+        
+        def put(event):
+            loop.call_soon_threadsafe(events.put_nowait, event)
+        
+        def produce():
+            try:
+                for text in self.engine.chat_turn_stream(session, message, cancel_event):
+                    put({"text": text})
+                put({"done": True, "session_id": session.session_id})
+            except Exception as e:
+                put({"error": str(e)})
+        
+        self.engine.scheduler.submit(produce, backend="gemini", cancel_event=cancel_event,
+                                     on_cancel=lambda: put({"error": "Request cancelled"}))
+        
+        head = ("HTTP/1.1 200 OK\r\n"
+                "Content-Type: application/x-ndjson; charset=utf-8\r\n"
+                "Transfer-Encoding: chunked\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        try:
+            writer.write(head.encode('latin-1'))
+            while True:
+                event = await events.get()
+                line = (json.dumps(event, ensure_ascii=False) + "\n").encode('utf-8')
+                writer.write(f"{len(line):x}\r\n".encode('ascii') + line + b"\r\n")
+                await writer.drain()
+                if "text" not in event:
+                    break
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+        except ConnectionError:
+            # Client went away: stop generating
+            cancel_event.set()
+            raise
+    
+    async def handle_tts_export(self, request, writer, keep_alive):
+        data = request.json()
+        text = data.get('text')
+        if not isinstance(text, str) or not text.strip():
+            raise HTTPError(400, "Provide 'text'")
+        try:
+            rate = int(data['rate']) if data.get('rate') else None
+        except (TypeError, ValueError):
+            raise HTTPError(400, "'rate' must be an integer")
+        
+        fd, path = tempfile.mkstemp(suffix='.wav')
+        os.close(fd)
+        
+        def export():
+            self.engine.export_speech(text, path, voice_id=data.get('voice_id'), rate=rate)
+            with open(path, 'rb') as f:
+                return f.read()
+        
+        try:
+            audio = await self.run_job(export, backend="local", error_status=500)
+        finally:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        return 200, 'audio/wav', audio
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless HTTP API for the Vietnamese AI Assistant")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, default=16, help="concurrent engine jobs")
+    parser.add_argument('--no-history', action='store_true',
+                        help="don't save chats or index summaries")
+    options = parser.parse_args(argv)
+    
+    # Many clients share one process: allow more concurrent model calls than
+    # the GUI does; set GEMINI_RPM / GEMINI_TPM to stay within a key's quota
+    scheduler = TaskScheduler(max_workers=options.workers,
+                              backend_limits={"gemini": options.workers, "web": options.workers,
+                                              "summarize": options.workers})
+    session_store = None if options.no_history else SessionStore()
+    search_index = None if options.no_history else SearchIndex()
+    engine = AssistantEngine(scheduler, session_store=session_store, search_index=search_index)
+    engine.api_manager.warm_up()
+    
+    service = AssistantService(engine, options.host, options.port)
+    try:
+        asyncio.run(service.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        scheduler.shutdown()
+        if session_store:
+            session_store.close()
+        if search_index:
+            search_index.close()
+
+
+if __name__ == '__main__':
+    main()
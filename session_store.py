@@ -0,0 +1,185 @@
+# session_store.py
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from app_paths import get_data_dir
+
+class SessionStore:
+    """Append-only on-disk store of chat sessions with a background writer"""
+    
+    # Length of the session title taken from the first user message
+    TITLE_LENGTH = 60
+    
+    def __init__(self, path=None):
+        self.path = path or os.path.join(get_data_dir(), 'sessions.sqlite')
+        
+        # Writes are queued and applied by one thread, so the Tk thread never waits on disk
+        self.write_queue = queue.Queue()
+        self.writer = None
+        self.writer_lock = threading.Lock()
+        
+        # Reads use their own connection; WAL lets them run alongside the writer
+        self.read_lock = threading.Lock()
+        self.read_conn = None
+    
+    def connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("""CREATE TABLE IF NOT EXISTS sessions (
+            id TEXT PRIMARY KEY,
+            title TEXT NOT NULL DEFAULT '',
+            created REAL NOT NULL,
+            updated REAL NOT NULL,
+            message_count INTEGER NOT NULL DEFAULT 0
+        )""")
+        conn.execute("""CREATE TABLE IF NOT EXISTS messages (
+            session_id TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            role TEXT NOT NULL,
+            content TEXT NOT NULL,
+            tag TEXT,
+            excluded INTEGER NOT NULL DEFAULT 0,
+            created REAL NOT NULL,
+            PRIMARY KEY (session_id, seq)
+        )""")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_updated ON sessions (updated)")
+        conn.commit()
+        return conn
+    
+    def submit(self, operation, *args):
+        """Queue a write and start the writer thread if needed"""
+        # Locked so concurrent first writes can't start two writers
+        with self.writer_lock:
+            if self.writer is None:
+                self.writer = threading.Thread(target=self.write_loop)
+                self.writer.daemon = True
+                self.writer.start()
+        self.write_queue.put((operation, args))
+    
+    def write_loop(self):
+        """Apply queued writes, committing once per burst"""
+        try:
+            conn = self.connect()
+        except Exception as e:
+            print(f"Error opening session store: {str(e)}")
+            conn = None
+        
+        while True:
+            batch = [self.write_queue.get()]
+            while True:
+                try:
+                    batch.append(self.write_queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            for operation, args in batch:
+                if operation == 'flush':
+                    continue
+                if conn is None:
+                    continue
+                try:
+                    getattr(self, 'write_' + operation)(conn, *args)
+                except Exception as e:
+                    print(f"Session store error: {str(e)}")
+            
+            if conn is not None:
+                try:
+                    conn.commit()
+                except Exception as e:
+                    print(f"Session store error: {str(e)}")
+            
+            for operation, args in batch:
+                if operation == 'flush':
+                    args[0].set()
+                self.write_queue.task_done()
+    
+    def create_session(self):
+        """Start a new session and return its id"""
+        session_id = uuid.uuid4().hex
+        self.submit('session', session_id, time.time())
+        return session_id
+    
+    def append_message(self, session_id, seq, message):
+        """Queue message number seq of a session for writing"""
+        self.submit('message', session_id, seq, message["role"], message["content"],
+                    message.get("tag"), bool(message.get("excluded")), time.time())
+    
+    def exclude_from(self, session_id, seq):
+        """Mark messages from seq on as left out of the model's context"""
+        self.submit('exclude', session_id, seq)
+    
+    def delete_session(self, session_id):
+        self.submit('delete', session_id)
+    
+    def write_session(self, conn, session_id, created):
+        conn.execute("INSERT OR IGNORE INTO sessions (id, created, updated) VALUES (?, ?, ?)",
+                     (session_id, created, created))
+    
+    def write_message(self, conn, session_id, seq, role, content, tag, excluded, created):
+        conn.execute(
+            "INSERT OR REPLACE INTO messages (session_id, seq, role, content, tag, excluded, created) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)", (session_id, seq, role, content, tag, int(excluded), created))
+        conn.execute("UPDATE sessions SET updated = ?, message_count = MAX(message_count, ?) "
+                     "WHERE id = ?", (created, seq + 1, session_id))
+        if role == "user":
+            title = " ".join(content.split())[:self.TITLE_LENGTH].rstrip()
+            conn.execute("UPDATE sessions SET title = ? WHERE id = ? AND title = ''", (title, session_id))
+    
+    def write_exclude(self, conn, session_id, seq):
+        conn.execute("UPDATE messages SET excluded = 1 WHERE session_id = ? AND seq >= ?",
+                     (session_id, seq))
+    
+    def write_delete(self, conn, session_id):
+        conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+        conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+    
+    def flush(self, timeout=None):
+        """Wait until every queued write is on disk"""
+        if self.writer is None:
+            return True
+        done = threading.Event()
+        self.write_queue.put(('flush', (done,)))
+        return done.wait(timeout)
+    
+    def read(self, query, params=()):
+        with self.read_lock:
+            if self.read_conn is None:
+                self.read_conn = self.connect()
+            return self.read_conn.execute(query, params).fetchall()
+    
+    def list_sessions(self, limit=100):
+        """Return (id, title, updated, message_count) of the newest non-empty sessions"""
+        return self.read(
+            "SELECT id, title, updated, message_count FROM sessions WHERE message_count > 0 "
+            "ORDER BY updated DESC LIMIT ?", (limit,))
+    
+    def load_tail(self, session_id, limit=200):
+        """Return (messages, first_seq, total) for the last limit messages of a session"""
+        rows = self.read("SELECT message_count FROM sessions WHERE id = ?", (session_id,))
+        total = rows[0][0] if rows else 0
+        first_seq = max(0, total - limit)
+        return self.load_range(session_id, first_seq, total), first_seq, total
+    
+    def load_range(self, session_id, start, end):
+        """Return messages start..end-1 of a session"""
+        rows = self.read(
+            "SELECT role, content, tag, excluded FROM messages "
+            "WHERE session_id = ? AND seq >= ? AND seq < ? ORDER BY seq", (session_id, start, end))
+        
+        messages = []
+        for role, content, tag, excluded in rows:
+            message = {"role": role, "content": content}
+            if tag:
+                message["tag"] = tag
+            if excluded:
+                message["excluded"] = True
+            messages.append(message)
+        return messages
+    
+    def close(self, timeout=2.0):
+        """Flush pending writes (best effort) before the application exits"""
+        self.flush(timeout)
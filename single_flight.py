@@ -0,0 +1,60 @@
+# single_flight.py
+import threading
+from concurrent.futures import Future, wait
+from metrics import metrics
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key onto one in-flight execution"""
+    
+    # How often (s) a waiting caller rechecks its cancel_event
+    POLL_SECONDS = 0.1
+    
+    def __init__(self, name='single_flight'):
+        self.name = name
+        self.lock = threading.Lock()
+        self.calls = {}
+        
+        # Calls answered by another caller's execution, since startup
+        self.shared = 0
+    
+    def do(self, key, func, *args, cancel_event=None, **kwargs):
+        """Run func(*args, **kwargs) unless the same key is already running; share its outcome
+        
+        cancel_event only stops a caller waiting on another caller's execution:
+        it raises InterruptedError and leaves that execution running. It is
+        not passed to func.
+        """
+        with self.lock:
+            future = self.calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self.calls[key] = future
+            else:
+                self.shared += 1
+        
+        if not leader:
+            metrics.increment('coalesced_calls_total', source=self.name)
+            while not future.done():
+                if cancel_event is not None and cancel_event.is_set():
+                    raise InterruptedError("Cancelled")
+                wait([future], timeout=self.POLL_SECONDS)
+            # Raises the leader's exception too
+            return future.result()
+        
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            # Later calls start a fresh execution (and may hit a cache instead)
+            with self.lock:
+                del self.calls[key]
+    
+    def in_flight(self):
+        with self.lock:
+            return len(self.calls)
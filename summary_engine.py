@@ -0,0 +1,191 @@
+# summary_engine.py
+import re
+from task_scheduler import TaskScheduler
+
+class SummaryEngine:
+    """Summarizes long documents by chunking, map and hierarchical reduce"""
+    
+    # Rough characters-per-token ratio, used to budget prompts without a network call
+    CHARS_PER_TOKEN = 4
+    
+    SUMMARY_PROMPT = """Tóm tắt văn bản sau một cách ngắn gọn nhưng đầy đủ ý chính:
+
+{text}
+
+Tóm tắt:"""
+
+    CHUNK_PROMPT = """Đây là phần {index}/{total} của một văn bản dài. Tóm tắt ngắn gọn các ý chính của phần này:
+
+{text}
+
+Tóm tắt:"""
+
+    REDUCE_PROMPT = """Dưới đây là bản tóm tắt của từng phần trong cùng một văn bản. Gộp chúng thành một bản tóm tắt ngắn gọn nhưng đầy đủ ý chính:
+
+{text}
+
+Tóm tắt:"""
+
+    PARAGRAPH_PATTERN = re.compile(r'\n\s*\n')
+    SENTENCE_PATTERN = re.compile(r'(?<=[.!?…])\s+')
+    
+    def __init__(self, api_manager, chunk_tokens=4000, scheduler=None):
+        self.api_manager = api_manager
+        self.chunk_tokens = chunk_tokens
+        # Model calls run as "gemini" jobs, so they count against its cap
+        self.scheduler = scheduler or TaskScheduler()
+    
+    def estimate_tokens(self, text):
+        """Estimate token count of text locally"""
+        return len(text) // self.CHARS_PER_TOKEN + 1
+    
+    def split_text(self, text, max_tokens=None):
+        """Split text on paragraph/sentence boundaries into token-budgeted chunks"""
+        max_tokens = max_tokens or self.chunk_tokens
+        max_chars = max_tokens * self.CHARS_PER_TOKEN
+        
+        # Break text into pieces that each fit the budget, remembering
+        # which separator joins a piece to the previous one
+        pieces = []
+        for paragraph in self.PARAGRAPH_PATTERN.split(text):
+            paragraph = paragraph.strip()
+            if not paragraph:
+                continue
+            
+            separator = "\n\n"
+            for piece in self._split_oversize(paragraph, max_chars):
+                pieces.append((separator, piece))
+                separator = " "
+        
+        # Greedily pack consecutive pieces into chunks
+        chunks = []
+        current = []
+        current_len = 0
+        for separator, piece in pieces:
+            added_len = len(piece) + (len(separator) if current else 0)
+            if current and current_len + added_len > max_chars:
+                chunks.append("".join(current))
+                current = []
+                current_len = 0
+                added_len = len(piece)
+            
+            if current:
+                current.append(separator)
+            current.append(piece)
+            current_len += added_len
+        
+        if current:
+            chunks.append("".join(current))
+        
+        return chunks
+    
+    def _split_oversize(self, paragraph, max_chars):
+        """Split a paragraph into sentences, then words, until pieces fit max_chars"""
+        if len(paragraph) <= max_chars:
+            return [paragraph]
+        
+        pieces = []
+        for sentence in self.SENTENCE_PATTERN.split(paragraph):
+            if len(sentence) <= max_chars:
+                pieces.append(sentence)
+                continue
+            
+            # Sentence alone is too long: cut at word boundaries
+            words = []
+            words_len = 0
+            for word in sentence.split():
+                if words and words_len + len(word) + 1 > max_chars:
+                    pieces.append(" ".join(words))
+                    words = []
+                    words_len = 0
+                
+                # A single "word" longer than the budget has to be sliced
+                while len(word) > max_chars:
+                    pieces.append(word[:max_chars])
+                    word = word[max_chars:]
+                
+                words.append(word)
+                words_len += len(word) + 1
+            
+            if words:
+                pieces.append(" ".join(words))
+        
+        return pieces
+    
+    def generate(self, prompt, cancel_event=None):
+        """Run a single prompt against the selected model"""
+        return self.api_manager.generate_text(prompt, cancel_event=cancel_event)
+    
+    def summarize(self, text, progress_callback=None, cancel_event=None):
+        """Summarize text of any length, reporting (done, total) model calls"""
+        chunks = self.split_text(text)
+        progress = {"done": 0}
+        
+        def report(stage_total, more_stages):
+            if progress_callback:
+                total = progress["done"] + stage_total + (1 if more_stages else 0)
+                progress_callback(progress["done"], total)
+        
+        if len(chunks) <= 1:
+            return self._run_stage([self.SUMMARY_PROMPT.format(text=text)], progress, report,
+                                   cancel_event)[0]
+        
+        # Map: summarize every chunk concurrently
+        total = len(chunks)
+        prompts = [self.CHUNK_PROMPT.format(index=i + 1, total=total, text=chunk)
+                   for i, chunk in enumerate(chunks)]
+        partials = self._run_stage(prompts, progress, report, cancel_event)
+        
+        # Reduce: merge partial summaries level by level until one remains
+        while len(partials) > 1:
+            groups = self._group_for_reduce(partials)
+            prompts = [self.REDUCE_PROMPT.format(text="\n\n".join(group)) for group in groups]
+            partials = self._run_stage(prompts, progress, report, cancel_event)
+        
+        return partials[0]
+    
+    def _group_for_reduce(self, partials):
+        """Pack partial summaries into groups that fit the chunk budget"""
+        max_chars = self.chunk_tokens * self.CHARS_PER_TOKEN
+        groups = []
+        current = []
+        current_len = 0
+        for partial in partials:
+            if current and current_len + len(partial) > max_chars:
+                groups.append(current)
+                current = []
+                current_len = 0
+            current.append(partial)
+            current_len += len(partial) + 2
+        
+        if current:
+            groups.append(current)
+        
+        # Always make progress, even when every partial is oversize
+        if len(groups) == len(partials):
+            groups = [partials[i:i + 2] for i in range(0, len(partials), 2)]
+        
+        return groups
+    
+    def _run_stage(self, prompts, progress, report, cancel_event=None):
+        """Run prompts as scheduler jobs, preserving order"""
+        results = [None] * len(prompts)
+        report(len(prompts), len(prompts) > 1)
+        
+        jobs = [self.scheduler.submit(self.generate, prompt, cancel_event, backend="gemini")
+                for prompt in prompts]
+        positions = {job: i for i, job in enumerate(jobs)}
+        
+        def finished(job):
+            if job.error is not None:
+                # wait() cancels the chunks that have not started yet
+                raise job.error
+            if job.state != job.DONE:
+                raise InterruptedError("Cancelled")
+            results[positions[job]] = job.result
+            progress["done"] += 1
+            remaining = sum(1 for result in results if result is None)
+            report(remaining, len(prompts) > 1)
+        
+        self.scheduler.wait(jobs, cancel_event, finished)
+        return results
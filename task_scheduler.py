@@ -0,0 +1,322 @@
+# task_scheduler.py
+import heapq
+import itertools
+import queue
+import threading
+import time
+from metrics import metrics
+
+class Job:
+    """Handle for work submitted to a TaskScheduler"""
+    
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+    
+    def __init__(self, func, args, kwargs, priority, backend, key, cancel_event,
+                 on_success, on_error, on_cancel):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.priority = priority
+        self.backend = backend
+        self.key = key
+        self.cancel_event = cancel_event or threading.Event()
+        self.on_success = on_success
+        self.on_error = on_error
+        self.on_cancel = on_cancel
+        self.state = self.PENDING
+        self.submitted = time.perf_counter()
+        self.result = None
+        self.error = None
+        # Set by TaskScheduler.wait: the waiter reports failures, not the worker
+        self.awaited = False
+    
+    def cancel(self):
+        """Ask the job to stop; a job that has not started yet never runs"""
+        self.cancel_event.set()
+    
+    def cancelled(self):
+        return self.cancel_event.is_set()
+    
+    def done(self):
+        return self.state in (self.DONE, self.FAILED, self.CANCELLED)
+
+
+class TaskScheduler:
+    """Shared worker pool with priorities, cancellation and per-backend concurrency caps"""
+    
+    # Lower runs first
+    PRIORITY_HIGH = 0
+    PRIORITY_NORMAL = 1
+    PRIORITY_LOW = 2
+    
+    # Jobs allowed to run at once per backend; unlisted backends are only
+    # limited by the pool size
+    DEFAULT_BACKEND_LIMITS = {
+        "gemini": 4,
+        "web": 4,
+        "batch": 1,
+        "local": 2,
+        # Documents summarized at once; their model calls run as "gemini" jobs
+        "summarize": 3,
+    }
+    
+    # How often (s) TaskScheduler.wait rechecks its cancel_event
+    WAIT_POLL_SECONDS = 0.1
+    
+    # How often (ms) callbacks are handed over to the Tk thread
+    POLL_INTERVAL_MS = 30
+    
+    def __init__(self, root=None, max_workers=8, backend_limits=None):
+        self.max_workers = max_workers
+        self.backend_limits = dict(self.DEFAULT_BACKEND_LIMITS)
+        if backend_limits:
+            self.backend_limits.update(backend_limits)
+        
+        # Pending jobs: heap of (priority, sequence, job)
+        self.pending = []
+        self.sequence = itertools.count()
+        self.running = {}
+        self.active = set()
+        self.keyed = {}
+        self.condition = threading.Condition()
+        self.workers = []
+        self.idle_workers = 0
+        # Running jobs blocked in wait(); they don't count against max_workers
+        self.blocked = 0
+        self.local = threading.local()
+        self.shutting_down = False
+        
+        # Callbacks for the Tk thread; only the Tk thread drains this queue
+        self.callbacks = queue.Queue()
+        self.root = None
+        if root is not None:
+            self.attach(root)
+    
+    def attach(self, root):
+        """Deliver callbacks on root's event loop"""
+        self.root = root
+        self.root.after(self.POLL_INTERVAL_MS, self.pump)
+    
+    def pump(self):
+        """Run queued callbacks on the Tk thread"""
+        try:
+            while True:
+                callback = self.callbacks.get_nowait()
+                try:
+                    callback()
+                except Exception as e:
+                    print(f"Scheduler callback error: {str(e)}")
+        except queue.Empty:
+            pass
+        
+        if not self.shutting_down:
+            self.root.after(self.POLL_INTERVAL_MS, self.pump)
+    
+    def post(self, callback, *args):
+        """Run callback(*args) on the Tk thread; safe to call from any thread"""
+        if self.root is None:
+            # No UI attached (scripts, services): run right away
+            callback(*args)
+        elif args:
+            self.callbacks.put(lambda: callback(*args))
+        else:
+            self.callbacks.put(callback)
+    
+    def submit(self, func, *args, priority=PRIORITY_NORMAL, backend=None, key=None,
+               cancel_event=None, on_success=None, on_error=None, on_cancel=None, **kwargs):
+        """Queue func(*args, **kwargs) and return its Job
+        
+        Exactly one of on_success(result), on_error(message) or on_cancel() runs
+        on the Tk thread when the job ends. A queued job with the same key is
+        replaced, so repeated clicks never pile up more than one waiting job.
+        """
+        job = Job(func, args, kwargs, priority, backend, key, cancel_event,
+                  on_success, on_error, on_cancel)
+        
+        with self.condition:
+            if self.shutting_down:
+                raise RuntimeError("Scheduler is shut down")
+            
+            if key is not None:
+                previous = self.keyed.get(key)
+                if previous is not None and previous.state == Job.PENDING:
+                    previous.cancel()
+                self.keyed[key] = job
+            
+            heapq.heappush(self.pending, (priority, next(self.sequence), job))
+            self.add_worker_if_needed()
+            self.condition.notify_all()
+        
+        return job
+    
+    def add_worker_if_needed(self):
+        """Start a worker if queued jobs outnumber idle workers (caller holds the lock)"""
+        pool_size = self.max_workers + self.blocked
+        if len(self.pending) > self.idle_workers and len(self.workers) < pool_size:
+            self.start_worker()
+    
+    def start_worker(self):
+        worker = threading.Thread(target=self.worker_loop, name=f"scheduler-{len(self.workers)}")
+        worker.daemon = True
+        self.workers.append(worker)
+        worker.start()
+    
+    def has_capacity(self, backend):
+        limit = self.backend_limits.get(backend)
+        return limit is None or self.running.get(backend, 0) < limit
+    
+    def next_job(self):
+        """Pop the best job whose backend has room (caller holds the lock)"""
+        if len(self.active) - self.blocked >= self.max_workers:
+            return None
+        
+        skipped = []
+        job = None
+        while self.pending:
+            entry = heapq.heappop(self.pending)
+            candidate = entry[2]
+            if candidate.cancelled():
+                self.finish(candidate, Job.CANCELLED)
+                continue
+            if self.has_capacity(candidate.backend):
+                job = candidate
+                break
+            skipped.append(entry)
+        
+        for entry in skipped:
+            heapq.heappush(self.pending, entry)
+        return job
+    
+    def finish(self, job, state):
+        """Record a job's final state (caller holds the lock)"""
+        job.state = state
+        if job.key is not None and self.keyed.get(job.key) is job:
+            del self.keyed[job.key]
+        if state == Job.CANCELLED and job.on_cancel:
+            self.post(job.on_cancel)
+        # Wake wait() callers
+        self.condition.notify_all()
+    
+    def worker_loop(self):
+        while True:
+            with self.condition:
+                job = self.next_job()
+                while job is None:
+                    if self.shutting_down:
+                        return
+                    self.idle_workers += 1
+                    self.condition.wait()
+                    self.idle_workers -= 1
+                    job = self.next_job()
+                
+                job.state = Job.RUNNING
+                self.active.add(job)
+                self.running[job.backend] = self.running.get(job.backend, 0) + 1
+            
+            backend = job.backend or "default"
+            started = time.perf_counter()
+            metrics.observe('scheduler_queue_seconds', started - job.submitted, backend=backend)
+            self.local.job = job
+            try:
+                result = job.func(*job.args, **job.kwargs)
+                error = None
+            except Exception as e:
+                result = None
+                error = e
+            finally:
+                self.local.job = None
+            metrics.observe('scheduler_job_seconds', time.perf_counter() - started, backend=backend)
+            
+            with self.condition:
+                self.running[job.backend] -= 1
+                self.active.discard(job)
+                # Decide the outcome once; a cancel arriving after this point is ignored
+                if job.cancelled():
+                    state = Job.CANCELLED
+                else:
+                    state = Job.DONE if error is None else Job.FAILED
+                job.result = result
+                job.error = error
+                self.finish(job, state)
+                report_error = not job.awaited
+                metrics.increment('scheduler_jobs_total', backend=backend, state=state)
+                # A backend slot opened up
+                self.condition.notify_all()
+            
+            if state == Job.CANCELLED:
+                continue
+            if error is None:
+                if job.on_success:
+                    self.post(job.on_success, result)
+            elif job.on_error:
+                self.post(job.on_error, str(error))
+            elif report_error:
+                print(f"Background job error: {str(error)}")
+    
+    def wait(self, jobs, cancel_event=None, on_done=None):
+        """Block until every job in jobs has ended, calling on_done(job) as each does
+        
+        on_done runs on the waiting thread and may append follow-up jobs to
+        jobs. A scheduler worker waiting here lends its place in the pool
+        (not its backend slot) until it returns, so jobs can wait on other
+        jobs without starving them. If cancel_event is set or on_done raises,
+        the unfinished jobs are cancelled; cancellation raises InterruptedError.
+        """
+        current = getattr(self.local, 'job', None)
+        handled = set()
+        with self.condition:
+            if current is not None:
+                self.blocked += 1
+                self.add_worker_if_needed()
+                self.condition.notify_all()
+        
+        try:
+            while True:
+                with self.condition:
+                    while True:
+                        if cancel_event is not None and cancel_event.is_set():
+                            raise InterruptedError("Cancelled")
+                        for job in jobs:
+                            job.awaited = True
+                        ready = [job for job in jobs if job not in handled and job.done()]
+                        if ready or len(handled) == len(jobs):
+                            break
+                        self.condition.wait(self.WAIT_POLL_SECONDS)
+                
+                if not ready:
+                    return
+                for job in ready:
+                    handled.add(job)
+                    if on_done:
+                        on_done(job)
+        except BaseException:
+            with self.condition:
+                for job in jobs:
+                    if not job.done():
+                        job.cancel()
+                self.condition.notify_all()
+            raise
+        finally:
+            if current is not None:
+                with self.condition:
+                    self.blocked -= 1
+    
+    def cancel_all(self):
+        """Cancel every queued and running job"""
+        with self.condition:
+            for _, _, job in self.pending:
+                job.cancel()
+            for job in self.active:
+                job.cancel()
+            self.condition.notify_all()
+    
+    def shutdown(self):
+        """Cancel outstanding work and let idle workers exit"""
+        self.cancel_all()
+        with self.condition:
+            self.shutting_down = True
+            self.condition.notify_all()
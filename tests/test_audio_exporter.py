@@ -0,0 +1,43 @@
+# tests/test_audio_exporter.py
+import os
+import tempfile
+import unittest
+import wave
+from audio_exporter import AudioExporter
+
+
+class ConcatenateTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = directory.name
+    
+    def write_wav(self, name, framerate):
+        path = os.path.join(self.path, name)
+        with wave.open(path, 'wb') as output:
+            output.setnchannels(1)
+            output.setsampwidth(2)
+            output.setframerate(framerate)
+            output.writeframes(b"\0\0" * 100)
+        return path
+    
+    def test_joins_parts(self):
+        parts = [self.write_wav("a.wav", 16000), self.write_wav("b.wav", 16000)]
+        output = os.path.join(self.path, "out.wav")
+        AudioExporter.concatenate_wavs(parts, output)
+        
+        with wave.open(output, 'rb') as joined:
+            self.assertEqual(joined.getnframes(), 200)
+        self.assertFalse(os.path.exists(output + '.tmp'))
+    
+    def test_failed_join_leaves_no_temp_file(self):
+        parts = [self.write_wav("a.wav", 16000), self.write_wav("b.wav", 22050)]
+        output = os.path.join(self.path, "out.wav")
+        with self.assertRaises(ValueError):
+            AudioExporter.concatenate_wavs(parts, output)
+        
+        self.assertEqual(sorted(os.listdir(self.path)), ["a.wav", "b.wav"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+# tests/test_batch_cli.py
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+import batch_cli
+
+
+class BatchCliTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.manifest = os.path.join(self.directory.name, "manifest.txt")
+        self.output = os.path.join(self.directory.name, "results.jsonl")
+    
+    def write_manifest(self, *items):
+        with open(self.manifest, 'w', encoding='utf-8') as f:
+            f.write("\n".join(items) + "\n")
+    
+    def run_main(self, *args):
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            code = batch_cli.main([self.manifest, '-o', self.output, *args])
+        return code, stderr.getvalue()
+    
+    def test_duplicates_of_a_pending_item_are_not_counted_as_done(self):
+        self.write_manifest("a.txt", "a.txt", "b.txt")
+        with open(self.output, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({"item": "b.txt", "ok": True}) + "\n")
+        
+        with mock.patch.object(batch_cli, 'AssistantEngine') as engine:
+            engine.return_value.api_manager.api_key = None
+            code, stderr = self.run_main()
+        
+        self.assertEqual(code, 2)
+        self.assertIn("3 items, 1 already done, 1 to process", stderr)
+    
+    def test_interrupt_returns_instead_of_exiting_the_process(self):
+        self.write_manifest("a.txt")
+        with mock.patch.object(batch_cli, 'AssistantEngine') as engine:
+            engine.return_value.api_manager.api_key = "key"
+            engine.return_value.batch_processor.run.side_effect = KeyboardInterrupt
+            code, stderr = self.run_main()
+        
+        self.assertEqual(code, 130)
+        self.assertIn("Interrupted", stderr)
+    
+    def test_worker_counts_must_be_positive(self):
+        for flag in ('-j', '--fetch-workers'):
+            with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+                batch_cli.parse_args(['-o', self.output, flag, '0'])
+        
+        options = batch_cli.parse_args(['-o', self.output, '-j', '2', '--fetch-workers', '5'])
+        self.assertEqual((options.jobs, options.fetch_workers), (2, 5))
+
+
+if __name__ == '__main__':
+    unittest.main()
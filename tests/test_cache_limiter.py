@@ -0,0 +1,59 @@
+# tests/test_cache_limiter.py
+import os
+import tempfile
+import time
+import unittest
+from cache_limiter import CacheLimiter
+
+
+class CacheLimiterTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = directory.name
+    
+    def write(self, name, size, age=0):
+        path = os.path.join(self.path, name)
+        with open(path, 'wb') as f:
+            f.write(b"x" * size)
+        stamp = time.time() - age
+        os.utime(path, (stamp, stamp))
+        return path
+    
+    def test_least_recently_used_entries_go_first_with_their_files(self):
+        for n, age in enumerate([400, 300, 200, 100]):
+            self.write(f"page{n}.json", 10, age)
+            self.write(f"page{n}.html", 90, age)
+        limiter = CacheLimiter(self.path, max_bytes=300)
+        # page0 was used recently, so page1 and page2 are the oldest
+        limiter.touch(os.path.join(self.path, "page0.json"))
+        
+        limiter.added(0)
+        
+        self.assertEqual(sorted(os.listdir(self.path)),
+                         ["page0.html", "page0.json", "page3.html", "page3.json"])
+        self.assertEqual(limiter.total, 200)
+    
+    def test_expired_entries_and_stale_temp_files_are_removed(self):
+        self.write("old.html", 10, age=1000)
+        self.write("new.html", 10)
+        self.write("crash.html.tmp", 10, age=2 * CacheLimiter.STALE_TMP_SECONDS)
+        self.write("writing.html.tmp", 10)
+        
+        CacheLimiter(self.path, max_bytes=10 ** 6, max_age=500).added(0)
+        
+        self.assertEqual(sorted(os.listdir(self.path)), ["new.html", "writing.html.tmp"])
+    
+    def test_writes_are_counted_until_the_budget_is_exceeded(self):
+        limiter = CacheLimiter(self.path, max_bytes=100)
+        limiter.added(0)
+        for n in range(3):
+            time.sleep(0.01)
+            self.write(f"entry{n}.wav", 40)
+            limiter.added(40)
+        
+        self.assertEqual(sorted(os.listdir(self.path)), ["entry1.wav", "entry2.wav"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+# tests/test_chat_transcript.py
+import unittest
+from chat_transcript import ChatTranscript
+from context_manager import ConversationContext
+
+
+def turns(count):
+    return [{"role": "user" if n % 2 == 0 else "assistant", "content": f"m{n}"} for n in range(count)]
+
+
+class TranscriptTrimTest(unittest.TestCase):
+    def test_trimmed_messages_are_paged_back_from_the_store(self):
+        stored = turns(500)
+        transcript = ChatTranscript()
+        transcript.loader = lambda start, end: [dict(message) for message in stored[start:end]]
+        for message in stored:
+            transcript.append(message["role"], message["content"])
+        
+        transcript.trim(350)
+        self.assertEqual(transcript.base, 350)
+        self.assertEqual(len(transcript.messages), 150)
+        self.assertEqual(len(transcript), 500)
+        
+        # Reading an older index pages it back in
+        self.assertEqual(transcript[120]["content"], "m120")
+        self.assertLessEqual(transcript.base, 120)
+        self.assertEqual(transcript.slice(120, 123), stored[120:123])
+    
+    def test_nothing_is_dropped_without_a_loader_or_below_a_page(self):
+        transcript = ChatTranscript()
+        for message in turns(300):
+            transcript.append(message["role"], message["content"])
+        transcript.trim(250)
+        self.assertEqual(transcript.base, 0)
+        
+        transcript.loader = lambda start, end: []
+        transcript.trim(transcript.LOAD_PAGE_SIZE - 1)
+        self.assertEqual(transcript.base, 0)
+
+
+class ReleaseSummarizedTest(unittest.TestCase):
+    def test_summarized_turns_are_released_with_their_notices(self):
+        context = ConversationContext(api_manager=None, scheduler=None)
+        history = turns(4)
+        history.insert(1, {"role": "system", "content": "notice"})
+        history.append({"role": "user", "content": "m4"})
+        context.summarized_count = 2
+        
+        dropped = context.release_summarized(history)
+        
+        # m0, the notice and m1 go; the rest is what build_contents sees next
+        self.assertEqual(dropped, 3)
+        self.assertEqual(context.summarized_count, 0)
+        self.assertEqual(context.release_summarized(history[dropped:]), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
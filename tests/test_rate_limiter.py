@@ -0,0 +1,35 @@
+# tests/test_rate_limiter.py
+import unittest
+from types import SimpleNamespace
+from rate_limiter import RateLimiter
+
+
+class ResourceExhausted(Exception):
+    pass
+
+
+class IsRetryableTest(unittest.TestCase):
+    def setUp(self):
+        self.limiter = RateLimiter()
+    
+    def test_status_codes_and_exception_types_are_retried(self):
+        error = Exception("quota")
+        error.code = 429
+        self.assertTrue(self.limiter.is_retryable(error))
+        
+        error = Exception("bad gateway")
+        error.response = SimpleNamespace(status_code=502)
+        self.assertTrue(self.limiter.is_retryable(error))
+        
+        self.assertTrue(self.limiter.is_retryable(ResourceExhausted("slow down")))
+    
+    def test_status_digits_in_the_message_are_ignored(self):
+        self.assertFalse(self.limiter.is_retryable(ValueError("Invalid prompt: 'order 429 of 503'")))
+        
+        error = Exception("400 Bad request: ticket 503")
+        error.code = 400
+        self.assertFalse(self.limiter.is_retryable(error))
+
+
+if __name__ == '__main__':
+    unittest.main()
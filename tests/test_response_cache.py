@@ -0,0 +1,20 @@
+# tests/test_response_cache.py
+import unittest
+from response_cache import ResponseCache
+
+
+class MakeKeyTest(unittest.TestCase):
+    def test_every_request_option_changes_the_key(self):
+        base = {"generation_config": {"temperature": 0.2}}
+        key = ResponseCache.make_key("model", "prompt", base)
+        
+        for option in ({"safety_settings": {"HARASSMENT": "BLOCK_NONE"}},
+                       {"system_instruction": "Trả lời ngắn gọn"},
+                       {"tools": ["search"]}):
+            self.assertNotEqual(ResponseCache.make_key("model", "prompt", {**base, **option}), key)
+        
+        self.assertEqual(ResponseCache.make_key("model", "prompt", dict(base)), key)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+# tests/test_search_index.py
+import os
+import tempfile
+import unittest
+from search_index import SearchIndex
+
+
+class SearchIndexTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+    
+    def test_search_ignores_diacritics(self):
+        index = SearchIndex(os.path.join(self.directory, 'search.sqlite'))
+        index.add("summary", "Tóm tắt về thời tiết Hà Nội", title="Hà Nội")
+        index.add("chat", "Một câu hỏi khác")
+        self.assertTrue(index.flush(5))
+        
+        results = index.search("ha noi")
+        self.assertEqual([result["title"] for result in results], ["Hà Nội"])
+    
+    def test_documents_are_dropped_once_the_writer_cannot_open_the_index(self):
+        # A directory where the database file should be: sqlite can't open it
+        path = os.path.join(self.directory, 'search.sqlite')
+        os.mkdir(path)
+        index = SearchIndex(path)
+        
+        index.add("chat", "first")
+        self.assertFalse(index.flush(5))
+        self.assertTrue(index.writer_failed)
+        
+        index.add("chat", "second")
+        self.assertEqual(index.write_queue.qsize(), 0)
+        self.assertFalse(index.flush(5))
+
+
+if __name__ == '__main__':
+    unittest.main()
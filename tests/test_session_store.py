@@ -0,0 +1,57 @@
+# tests/test_session_store.py
+import os
+import tempfile
+import threading
+import unittest
+from session_store import SessionStore
+
+
+class SessionStoreTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.store = SessionStore(os.path.join(directory.name, 'sessions.sqlite'))
+    
+    def test_concurrent_first_writes_start_one_writer(self):
+        started = []
+        original = threading.Thread.start
+        
+        def record_start(thread):
+            if thread._target == self.store.write_loop:
+                started.append(thread)
+            original(thread)
+        
+        barrier = threading.Barrier(8)
+        
+        def first_write():
+            barrier.wait()
+            self.store.create_session()
+        
+        threading.Thread.start = record_start
+        try:
+            threads = [threading.Thread(target=first_write) for _ in range(8)]
+            for thread in threads:
+                original(thread)
+            for thread in threads:
+                thread.join(5)
+        finally:
+            threading.Thread.start = original
+        
+        self.assertEqual(len(started), 1)
+        self.assertTrue(self.store.flush(5))
+        self.assertEqual(len(self.store.read("SELECT id FROM sessions")), 8)
+    
+    def test_messages_round_trip(self):
+        session_id = self.store.create_session()
+        for seq, content in enumerate(["xin chào", "chào bạn"]):
+            role = "user" if seq == 0 else "assistant"
+            self.store.append_message(session_id, seq, {"role": role, "content": content})
+        self.store.flush(5)
+        
+        messages, first, total = self.store.load_tail(session_id, limit=1)
+        self.assertEqual((first, total), (1, 2))
+        self.assertEqual(messages, [{"role": "assistant", "content": "chào bạn"}])
+
+
+if __name__ == '__main__':
+    unittest.main()
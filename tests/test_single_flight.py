@@ -0,0 +1,58 @@
+# tests/test_single_flight.py
+import threading
+import time
+import unittest
+from single_flight import SingleFlight
+
+
+class SingleFlightTest(unittest.TestCase):
+    def test_concurrent_callers_share_one_execution(self):
+        flight = SingleFlight('test')
+        release = threading.Event()
+        calls = []
+        
+        def work():
+            calls.append(1)
+            release.wait(5)
+            return "result"
+        
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(flight.do("key", work)))
+                   for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        while flight.shared < 2:
+            time.sleep(0.01)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ["result"] * 3)
+    
+    def test_cancelled_follower_detaches_without_stopping_the_leader(self):
+        flight = SingleFlight('test')
+        release = threading.Event()
+        leader_result = []
+        
+        leader = threading.Thread(
+            target=lambda: leader_result.append(flight.do("key", release.wait, 5)))
+        leader.start()
+        while not flight.in_flight():
+            time.sleep(0.01)
+        
+        cancel_event = threading.Event()
+        threading.Timer(0.05, cancel_event.set).start()
+        started = time.perf_counter()
+        with self.assertRaises(InterruptedError):
+            flight.do("key", release.wait, 5, cancel_event=cancel_event)
+        self.assertLess(time.perf_counter() - started, 1)
+        
+        self.assertTrue(leader.is_alive())
+        release.set()
+        leader.join(5)
+        self.assertEqual(leader_result, [True])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+# tests/test_summarizer_module.py
+import os
+import tempfile
+import unittest
+from unittest import mock
+import summarizer_module
+from summarizer_module import SummarizerModule
+
+
+class FakeText:
+    """Stand-in for the input Text widget, so no display is needed"""
+    
+    def __init__(self, content=""):
+        self.content = content
+    
+    def get(self, start, end):
+        return self.content
+    
+    def delete(self, start, end):
+        self.content = ""
+    
+    def insert(self, index, text):
+        self.content += text
+    
+    def config(self, **kwargs):
+        pass
+
+
+def make_module(content="", api_key=None):
+    module = SummarizerModule.__new__(SummarizerModule)
+    module.input_text = FakeText(content)
+    module.api_manager = mock.Mock(api_key=api_key)
+    return module
+
+
+class BatchInputTest(unittest.TestCase):
+    def test_load_directory_lists_text_files(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for name in ("a.txt", "b.txt", "c.md"):
+                with open(os.path.join(directory, name), 'w', encoding='utf-8') as f:
+                    f.write("x")
+            
+            module = make_module()
+            with mock.patch.object(summarizer_module.filedialog, 'askdirectory', return_value=directory), \
+                 mock.patch.object(summarizer_module, 'messagebox') as messagebox:
+                module.load_directory()
+            
+            messagebox.showerror.assert_not_called()
+            listed = module.input_text.content.splitlines()
+            self.assertEqual([os.path.basename(path) for path in listed], ["a.txt", "b.txt"])
+    
+    def test_summarize_batch_parses_items_before_checking_key(self):
+        module = make_module("https://example.com/a\n# comment\n\nnotes.txt\n")
+        with mock.patch.object(summarizer_module, 'messagebox') as messagebox:
+            module.summarize_batch()
+        
+        # Items were parsed; without an API key the batch stops at the key check
+        messagebox.showwarning.assert_not_called()
+        messagebox.showerror.assert_called_once()
+    
+    def test_summarize_batch_warns_on_empty_input(self):
+        module = make_module("\n# only a comment\n")
+        with mock.patch.object(summarizer_module, 'messagebox') as messagebox:
+            module.summarize_batch()
+        messagebox.showwarning.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
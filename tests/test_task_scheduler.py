@@ -0,0 +1,74 @@
+# tests/test_task_scheduler.py
+import threading
+import time
+import unittest
+from task_scheduler import TaskScheduler
+
+
+class WaitTest(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = TaskScheduler(max_workers=2, backend_limits={"outer": 2, "inner": 2})
+    
+    def tearDown(self):
+        self.scheduler.shutdown()
+    
+    def test_jobs_waiting_on_jobs_do_not_starve_the_pool(self):
+        # Both workers run outer jobs that wait on inner jobs
+        def outer(n):
+            jobs = [self.scheduler.submit(lambda i=i: n * 10 + i, backend="inner") for i in range(3)]
+            self.scheduler.wait(jobs)
+            return [job.result for job in jobs]
+        
+        results = []
+        jobs = [self.scheduler.submit(outer, n, backend="outer") for n in range(2)]
+        waiter = threading.Thread(target=self.scheduler.wait, args=(jobs, None, results.append))
+        waiter.start()
+        waiter.join(5)
+        
+        self.assertFalse(waiter.is_alive())
+        self.assertEqual(sorted(job.result for job in results), [[0, 1, 2], [10, 11, 12]])
+    
+    def test_backend_cap_holds_for_waited_jobs(self):
+        running = []
+        peak = []
+        lock = threading.Lock()
+        
+        def work():
+            with lock:
+                running.append(1)
+                peak.append(len(running))
+            time.sleep(0.02)
+            with lock:
+                running.pop()
+        
+        jobs = [self.scheduler.submit(work, backend="inner") for _ in range(6)]
+        self.scheduler.wait(jobs)
+        self.assertLessEqual(max(peak), 2)
+    
+    def test_cancel_event_interrupts_and_cancels_queued_jobs(self):
+        release = threading.Event()
+        cancel_event = threading.Event()
+        jobs = [self.scheduler.submit(release.wait, 5, backend="inner") for _ in range(4)]
+        
+        threading.Timer(0.05, cancel_event.set).start()
+        with self.assertRaises(InterruptedError):
+            self.scheduler.wait(jobs, cancel_event)
+        release.set()
+        
+        self.assertTrue(all(job.cancelled() for job in jobs))
+    
+    def test_on_done_can_add_follow_up_jobs(self):
+        jobs = [self.scheduler.submit(lambda: 1)]
+        seen = []
+        
+        def on_done(job):
+            seen.append(job.result)
+            if job.result < 3:
+                jobs.append(self.scheduler.submit(lambda value=job.result: value + 1))
+        
+        self.scheduler.wait(jobs, on_done=on_done)
+        self.assertEqual(seen, [1, 2, 3])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+# tests/test_voice_manager.py
+import os
+import tempfile
+import threading
+import time
+import unittest
+from voice_manager import VoiceManager
+
+
+class FakeEngine:
+    """pyttsx3 stand-in speaking one word per iterate() of an external loop"""
+    
+    def __init__(self):
+        self.callbacks = {}
+        self.next_token = 0
+        self.queue = []
+        self.current = None
+        self.spoken = []
+        self.started = []
+        self.loops = 0
+        self.in_loop = False
+        self.owner = None
+    
+    def check_thread(self):
+        self.owner = self.owner or threading.current_thread()
+        assert self.owner is threading.current_thread(), "engine used from two threads"
+    
+    def setProperty(self, name, value):
+        self.check_thread()
+    
+    def connect(self, topic, callback):
+        self.next_token += 1
+        self.callbacks[self.next_token] = (topic, callback)
+        return self.next_token
+    
+    def disconnect(self, token):
+        del self.callbacks[token]
+    
+    def notify(self, topic, **kwargs):
+        for callback_topic, callback in list(self.callbacks.values()):
+            if callback_topic == topic:
+                callback(name=None, **kwargs)
+    
+    def say(self, text):
+        self.check_thread()
+        self.queue.append(text)
+    
+    def stop(self):
+        self.check_thread()
+        self.queue.clear()
+        if self.current is not None:
+            self.current = None
+            self.notify('finished-utterance', completed=False)
+    
+    def startLoop(self, use_driver_loop=True):
+        assert not use_driver_loop and not self.in_loop
+        self.in_loop = True
+        self.loops += 1
+    
+    def endLoop(self):
+        assert self.in_loop
+        self.in_loop = False
+    
+    def iterate(self):
+        self.check_thread()
+        assert self.in_loop
+        if self.current is None:
+            if not self.queue:
+                return
+            text = self.queue.pop(0)
+            self.current = [text, text.split()]
+            self.started.append(time.perf_counter())
+            self.notify('started-utterance')
+        
+        text, words = self.current
+        if words:
+            words.pop(0)
+            self.notify('started-word', location=0, length=1)
+        elif self.current is not None:
+            self.current = None
+            self.spoken.append(text)
+            self.notify('finished-utterance', completed=True)
+
+
+class SpeakChunksTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.voice_manager = VoiceManager(os.path.join(directory.name, 'voices.json'))
+        self.engine = self.voice_manager._tts_engine = FakeEngine()
+    
+    def test_chunks_produced_during_playback_join_the_running_loop(self):
+        def chunks():
+            for n in range(4):
+                time.sleep(0.03)
+                yield f"phần {n} có vài từ"
+                yield "   "
+        
+        progress = []
+        future = self.voice_manager.speak_chunks(chunks(), progress_callback=progress.append)
+        
+        self.assertTrue(future.result(5))
+        self.assertEqual(self.engine.spoken, [f"phần {n} có vài từ" for n in range(4)])
+        self.assertEqual(progress, [1, 2, 3, 4])
+        self.assertEqual(self.engine.loops, 1)
+    
+    def test_pause_is_a_gap_between_utterances(self):
+        future = self.voice_manager.speak_chunks(["một hai", "ba bốn", "năm"], pause_duration=0.1)
+        
+        self.assertTrue(future.result(5))
+        gaps = [b - a for a, b in zip(self.engine.started, self.engine.started[1:])]
+        self.assertEqual(len(gaps), 2)
+        self.assertTrue(all(gap >= 0.1 for gap in gaps))
+    
+    def test_stop_ends_the_session(self):
+        stop_event = threading.Event()
+        chunks = [" ".join(["từ"] * 50)] * 5
+        future = self.voice_manager.speak_chunks(chunks, stop_event=stop_event)
+        threading.Timer(0.1, stop_event.set).start()
+        
+        self.assertFalse(future.result(5))
+        self.assertLess(len(self.engine.spoken), 5)
+        self.assertFalse(self.engine.in_loop)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,159 @@
+# text_segmenter.py
+import re
+
+class TextSegmenter:
+    """Single-pass sentence segmenter that packs sentences into bounded chunks"""
+    
+    # Boundary candidates, scanned once from left to right. The leading
+    # lookahead lets the regex engine skip ordinary characters quickly.
+    BOUNDARY_PATTERN = re.compile(r"""
+        (?=[\n.!?…])
+        (?:
+        (?P<paragraph>\n[ \t\r\f\v]*\n)                 # blank line
+      | (?P<line>\n)                                    # single line break
+      | (?P<ellipsis>\.{2,}|…)[”"’)\]»]*(?=\s|$)        # ellipsis
+      | (?P<stop>[.!?]+)[”"’)\]»]*(?=\s|$)              # full stop, question, exclamation
+        )
+    """, re.VERBOSE)
+    
+    NEXT_CHAR_PATTERN = re.compile(r'\s*(\S)')
+    
+    # Tokens followed by a period that usually do not end a sentence
+    ABBREVIATIONS = frozenset([
+        'TP', 'Tp', 'TT', 'TS', 'ThS', 'PGS', 'GS', 'BS', 'KS', 'CN', 'NXB', 'ĐH', 'Q', 'P',
+        'St', 'Mr', 'Mrs', 'Ms', 'Dr', 'Prof', 'Jr', 'Sr', 'vs', 'No',
+        'v.v', 'vv', 'etc',
+    ])
+    
+    # Abbreviations that end a sentence when a capitalized word follows
+    FINAL_ABBREVIATIONS = frozenset(['v.v', 'vv', 'etc'])
+    
+    # How far back to look for the word before a period
+    WORD_LOOKBACK = 12
+    
+    def __init__(self, max_length=250):
+        self.max_length = max(1, max_length)
+    
+    def next_char(self, text, pos):
+        """Return the first non-space character at or after pos ('' at end)"""
+        match = self.NEXT_CHAR_PATTERN.match(text, pos)
+        return match.group(1) if match else ''
+    
+    def is_abbreviation(self, text, stop_start):
+        """Check whether the period at stop_start closes an abbreviation"""
+        lookback = max(0, stop_start - self.WORD_LOOKBACK)
+        word_start = max(text.rfind(' ', lookback, stop_start), text.rfind('\n', lookback, stop_start))
+        word = text[word_start + 1:stop_start].lstrip('(["“‘')
+        
+        if word in self.ABBREVIATIONS:
+            return word
+        # "PGS.TS." style chains end in a known abbreviation
+        last_part = word.rsplit('.', 1)[-1]
+        if last_part in self.ABBREVIATIONS:
+            return last_part
+        # Single-letter initials such as "Nguyễn V. A."
+        if len(word) == 1 and word.isupper():
+            return word
+        return None
+    
+    def iter_sentences(self, text):
+        """Yield (start, end, paragraph_end) spans of non-empty sentences, whitespace trimmed"""
+        start = 0
+        for match in self.BOUNDARY_PATTERN.finditer(text):
+            kind = match.lastgroup
+            
+            if kind == 'paragraph' or kind == 'line':
+                end = match.start()
+            else:
+                end = match.end()
+                if kind == 'ellipsis':
+                    # "và... rồi" continues the sentence; "... Sau đó" starts a new one
+                    following = self.next_char(text, end)
+                    if following and not (following.isupper() or following.isdigit()):
+                        continue
+                elif match.group('stop') == '.':
+                    abbreviation = self.is_abbreviation(text, match.start())
+                    if abbreviation and not (abbreviation in self.FINAL_ABBREVIATIONS
+                                             and self.next_char(text, end).isupper()):
+                        continue
+            
+            span = self.trim(text, start, end)
+            if span:
+                yield span[0], span[1], kind == 'paragraph'
+            elif kind == 'paragraph':
+                # Blank line right after a sentence still closes the paragraph
+                yield end, end, True
+            start = match.end()
+        
+        span = self.trim(text, start, len(text))
+        if span:
+            yield span[0], span[1], True
+    
+    @staticmethod
+    def trim(text, start, end):
+        """Shrink [start, end) past surrounding whitespace; None if nothing is left"""
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        return (start, end) if start < end else None
+    
+    def find_cut(self, text, start, limit):
+        """Find where to cut an oversize sentence: clause, then word, then hard limit"""
+        floor = start + (limit - start) // 3
+        clause = max(text.rfind(',', floor, limit), text.rfind(';', floor, limit),
+                     text.rfind(':', floor, limit))
+        if clause >= floor:
+            return clause + 1
+        
+        space = max(text.rfind(' ', floor, limit), text.rfind('\t', floor, limit),
+                    text.rfind('\n', floor, limit))
+        if space >= floor:
+            return space + 1
+        
+        return limit
+    
+    def split_long(self, text, start, end):
+        """Yield pieces of an oversize sentence, each within max_length"""
+        while end - start > self.max_length:
+            cut = self.find_cut(text, start, start + self.max_length)
+            piece = text[start:cut].strip()
+            if piece:
+                yield piece
+            start = cut
+        
+        piece = text[start:end].strip()
+        if piece:
+            yield piece
+    
+    def iter_chunks(self, text):
+        """Lazily yield chunks of whole sentences, each at most max_length long"""
+        chunk_start = None
+        chunk_end = 0
+        
+        for start, end, paragraph_end in self.iter_sentences(text):
+            if start == end:
+                # Empty marker: just close the current paragraph
+                pass
+            elif end - start > self.max_length:
+                if chunk_start is not None:
+                    yield text[chunk_start:chunk_end]
+                    chunk_start = None
+                yield from self.split_long(text, start, end)
+                continue
+            else:
+                if chunk_start is not None and end - chunk_start > self.max_length:
+                    yield text[chunk_start:chunk_end]
+                    chunk_start = None
+                
+                if chunk_start is None:
+                    chunk_start = start
+                chunk_end = end
+            
+            # Paragraphs never share a chunk
+            if paragraph_end and chunk_start is not None:
+                yield text[chunk_start:chunk_end]
+                chunk_start = None
+        
+        if chunk_start is not None:
+            yield text[chunk_start:chunk_end]
@@ -1,83 +1,506 @@
-# voice_manager.py
-import pyttsx3
-
-class VoiceManager:
-    """Manages text-to-speech voices and settings"""
-    
-    def __init__(self):
-        # Initialize TTS engine
-        self.tts_engine = pyttsx3.init()
-        
-        # Get available voices
-        self.voices = self.tts_engine.getProperty('voices')
-        
-        # Current voice selections
-        self.current_voice_id = self.voices[0].id if self.voices else None
-        self.rate = 200  # Default speed
-        
-        # Categorized voices
-        self.voice_data = self.categorize_voices()
-    
-    def categorize_voices(self):
-        """Categorize available voices by language and gender"""
-        voice_data = {
-            "Vietnamese": {"Male": [], "Female": []},
-            "English": {"Male": [], "Female": []},
-            "Chinese": {"Male": [], "Female": []},
-            "Japanese": {"Male": [], "Female": []},
-            "Other": {"Male": [], "Female": []}
-        }
-        
-        # Helper function to determine gender
-        def predict_gender(voice_name):
-            female_indicators = ['female', 'woman', 'girl', 'nữ']
-            for indicator in female_indicators:
-                if indicator in voice_name.lower():
-                    return "Female"
-            return "Male"  # Default to male if not specified
-        
-        for voice in self.voices:
-            voice_name = voice.name.lower()
-            gender = predict_gender(voice_name)
-            
-            # Categorize by language patterns
-            if any(pattern in voice_name for pattern in ['vietnam', 'vi-vn']):
-                voice_data["Vietnamese"][gender].append(voice)
-            elif any(pattern in voice_name for pattern in ['en-us', 'en-gb', 'english']):
-                voice_data["English"][gender].append(voice)
-            elif any(pattern in voice_name for pattern in ['chinese', 'zh', 'cmn']):
-                voice_data["Chinese"][gender].append(voice)
-            elif any(pattern in voice_name for pattern in ['japan', 'jp', 'ja']):
-                voice_data["Japanese"][gender].append(voice)
-            else:
-                voice_data["Other"][gender].append(voice)
-        
-        return voice_data
-    
-    def set_voice(self, voice_id):
-        """Set the active voice"""
-        self.current_voice_id = voice_id
-    
-    def set_rate(self, rate):
-        """Set speech rate"""
-        self.rate = rate
-    
-    def speak(self, text):
-        """Convert text to speech"""
-        if not text.strip():
-            return False
-            
-        try:
-            # Configure engine
-            self.tts_engine.setProperty('rate', self.rate)
-            
-            if self.current_voice_id:
-                self.tts_engine.setProperty('voice', self.current_voice_id)
-            
-            # Perform speech
-            self.tts_engine.say(text)
-            self.tts_engine.runAndWait()
-            return True
-        except Exception as e:
-            print(f"TTS error: {str(e)}")
-            return False
+# voice_manager.py
+import hashlib
+import json
+import os
+import queue
+import re
+import threading
+import time
+from concurrent.futures import Future
+from app_paths import get_cache_dir
+from metrics import metrics
+
+class VoiceEntry:
+    """Catalog record of an installed voice"""
+    
+    def __init__(self, id, name, languages=(), language="Other", gender="Male"):
+        self.id = id
+        self.name = name
+        # Normalized language tags, e.g. ["en-us"]
+        self.languages = list(languages)
+        self.language = language
+        self.gender = gender
+    
+    def to_dict(self):
+        return {"id": self.id, "name": self.name, "languages": self.languages,
+                "language": self.language, "gender": self.gender}
+    
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["id"], data["name"], data.get("languages", ()),
+                   data.get("language", "Other"), data.get("gender", "Male"))
+
+
+class VoiceRegistry:
+    """Installed voices indexed by id, name, language tag, language and gender"""
+    
+    LANGUAGES = ("Vietnamese", "English", "Chinese", "Japanese", "Other")
+    GENDERS = ("Male", "Female")
+    
+    def __init__(self, voices):
+        self.voices = list(voices)
+        self.by_id = {}
+        self.by_name = {}
+        self.by_tag = {}
+        self.by_language = {language: {gender: [] for gender in self.GENDERS} for language in self.LANGUAGES}
+        self.by_gender = {gender: [] for gender in self.GENDERS}
+        
+        for voice in self.voices:
+            self.by_id[voice.id] = voice
+            # Names are not unique on every platform; the first one wins
+            self.by_name.setdefault(voice.name, voice)
+            # "en-us" is found under both "en-us" and "en"
+            tags = dict.fromkeys(key for tag in voice.languages for key in (tag, tag.split('-')[0]))
+            for tag in tags:
+                self.by_tag.setdefault(tag, []).append(voice)
+            self.by_language[voice.language][voice.gender].append(voice)
+            self.by_gender[voice.gender].append(voice)
+    
+    def select(self, language, gender):
+        """Voices of one language and gender"""
+        return self.by_language.get(language, {}).get(gender, [])
+
+
+class VoiceManager:
+    """Manages text-to-speech voices and settings"""
+    
+    # Bump when the catalog format or classification rules change
+    CATALOG_VERSION = 1
+    
+    # Primary language subtag -> voice_data language
+    LANGUAGE_TAGS = {
+        "vi": "Vietnamese",
+        "en": "English",
+        "zh": "Chinese", "cmn": "Chinese", "yue": "Chinese",
+        "ja": "Japanese",
+    }
+    
+    # Seconds the speech thread must be idle before the cached catalog is
+    # checked, so the voice enumeration never holds up speech
+    VERIFY_IDLE_SECONDS = 2.0
+    
+    # How often (s) the chunked-speech loop pumps engine events
+    LOOP_INTERVAL = 0.01
+    
+    def __init__(self, catalog_path=None):
+        # The TTS engine is created on first use; pyttsx3.init and voice
+        # enumeration are slow, so the voice list comes from a cached catalog
+        self._tts_engine = None
+        self._registry = None
+        self.init_lock = threading.RLock()
+        
+        # Catalog of installed voices, keyed by a fingerprint of the voice list
+        self.catalog_path = catalog_path or os.path.join(get_cache_dir(), 'voices.json')
+        self.catalog_fingerprint = None
+        # True once the catalog has been checked against the installed voices
+        self.catalog_verified = False
+        self.verify_requested = False
+        # Called with the new registry whenever the catalog is replaced
+        self.catalog_listeners = []
+        
+        # pyttsx3 does not tolerate use from several threads, so one speech
+        # thread owns the engine and runs queued commands in order
+        self.commands = queue.Queue()
+        self.worker = None
+        self.worker_lock = threading.RLock()
+        # Futures of queued or playing speech -> their stop events
+        self.speech_jobs = {}
+        
+        # Current voice selections (None means the engine default)
+        self.current_voice_id = None
+        self.rate = 200  # Default speed
+    
+    @property
+    def tts_engine(self):
+        """The pyttsx3 engine, initialized on first access (speech thread only)"""
+        if self._tts_engine is None:
+            import pyttsx3
+            self._tts_engine = pyttsx3.init()
+        return self._tts_engine
+    
+    @property
+    def registry(self):
+        """Voice indexes, read from the catalog cache (or built) on first access"""
+        with self.init_lock:
+            if self._registry is None:
+                voices, fingerprint = self.load_catalog()
+                if voices is None:
+                    voices, fingerprint = self.scan_voices()
+                    self.save_catalog(voices, fingerprint)
+                    self.catalog_verified = True
+                self.set_catalog(voices, fingerprint)
+            return self._registry
+    
+    @property
+    def voices(self):
+        """Installed voices as catalog entries"""
+        return self.registry.voices
+    
+    @property
+    def voice_data(self):
+        """Voices categorized by language and gender"""
+        return self.registry.by_language
+    
+    def set_catalog(self, voices, fingerprint):
+        with self.init_lock:
+            registry = self._registry = VoiceRegistry(voices)
+            self.catalog_fingerprint = fingerprint
+            if self.current_voice_id not in registry.by_id and voices:
+                self.current_voice_id = voices[0].id
+        
+        for listener in list(self.catalog_listeners):
+            listener(registry)
+    
+    def add_catalog_listener(self, callback):
+        """Call callback(registry) when the catalog changes; runs on the thread that changed it"""
+        self.catalog_listeners.append(callback)
+    
+    @staticmethod
+    def fingerprint_voices(raw_voices):
+        """Hash of the installed voice list; changes when voices are added or removed"""
+        payload = json.dumps([[v.id, v.name, [str(tag) for tag in v.languages or ()], v.gender]
+                              for v in raw_voices], ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def scan_voices(self):
+        """Enumerate installed voices; returns (entries, fingerprint)"""
+        with metrics.timed('tts_voice_scan_seconds'):
+            raw_voices = self.call('voices')
+            return [self.describe_voice(v) for v in raw_voices], self.fingerprint_voices(raw_voices)
+    
+    def load_catalog(self):
+        """Return (entries, fingerprint) from the catalog cache, or (None, None)"""
+        try:
+            with open(self.catalog_path, 'r', encoding='utf-8') as f:
+                catalog = json.load(f)
+            if catalog.get("version") != self.CATALOG_VERSION:
+                return None, None
+            return [VoiceEntry.from_dict(v) for v in catalog["voices"]], catalog["fingerprint"]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None, None
+    
+    def save_catalog(self, voices, fingerprint):
+        catalog = {"version": self.CATALOG_VERSION, "fingerprint": fingerprint,
+                   "voices": [v.to_dict() for v in voices]}
+        try:
+            with open(self.catalog_path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump(catalog, f, ensure_ascii=False)
+            os.replace(self.catalog_path + '.tmp', self.catalog_path)
+        except OSError as e:
+            print(f"Error caching voice catalog: {str(e)}")
+    
+    def verify_catalog(self):
+        """Check a cached catalog against the installed voices; returns True if it was rebuilt"""
+        # Nothing loaded yet: whoever loads it builds it from the installed voices
+        if self.catalog_verified or self._registry is None:
+            return False
+        
+        raw_voices = self.call('voices')
+        fingerprint = self.fingerprint_voices(raw_voices)
+        self.catalog_verified = True
+        if fingerprint == self.catalog_fingerprint:
+            return False
+        
+        voices = [self.describe_voice(v) for v in raw_voices]
+        self.set_catalog(voices, fingerprint)
+        self.save_catalog(voices, fingerprint)
+        return True
+    
+    def warm_up(self):
+        """Import the TTS library, load the voice catalog and have it checked once speech is idle"""
+        import pyttsx3  # noqa: F401
+        self.registry
+        if not self.catalog_verified:
+            self.verify_requested = True
+            self.start_worker()
+    
+    @staticmethod
+    def normalize_language_tag(tag):
+        """Turn a driver language value (b'\\x05en-us', 'en_US', ...) into 'en-us', or ''"""
+        if isinstance(tag, bytes):
+            tag = tag.decode('utf-8', errors='ignore')
+        # Older espeak bindings prefix the tag with a priority byte
+        tag = re.sub(r'^[^0-9A-Za-z]+', '', str(tag or '').strip())
+        tag = tag.lower().replace('_', '-')
+        return '' if tag in ('', 'unknown', 'none') else tag
+    
+    def describe_voice(self, voice):
+        """Catalog entry for a pyttsx3 voice, preferring the metadata the driver reports"""
+        languages = [tag for tag in map(self.normalize_language_tag, voice.languages or ()) if tag]
+        name_language, name_gender = self.classify_voice(voice.name or "")
+        
+        language = name_language
+        for tag in languages:
+            if tag.split('-')[0] in self.LANGUAGE_TAGS:
+                language = self.LANGUAGE_TAGS[tag.split('-')[0]]
+                break
+        
+        gender = str(voice.gender or '').lower()
+        if 'female' in gender:
+            gender = "Female"
+        elif 'male' in gender:
+            gender = "Male"
+        else:
+            gender = name_gender
+        
+        return VoiceEntry(voice.id, voice.name or voice.id, languages, language, gender)
+    
+    @staticmethod
+    def classify_voice(voice_name):
+        """Guess (language, gender) from a voice name, for drivers that report neither"""
+        voice_name = voice_name.lower()
+        
+        female_indicators = ['female', 'woman', 'girl', 'nữ']
+        gender = "Female" if any(indicator in voice_name for indicator in female_indicators) else "Male"
+        
+        # Categorize by language patterns
+        if any(pattern in voice_name for pattern in ['vietnam', 'vi-vn']):
+            language = "Vietnamese"
+        elif any(pattern in voice_name for pattern in ['en-us', 'en-gb', 'english']):
+            language = "English"
+        elif any(pattern in voice_name for pattern in ['chinese', 'zh', 'cmn']):
+            language = "Chinese"
+        elif any(pattern in voice_name for pattern in ['japan', 'jp', 'ja']):
+            language = "Japanese"
+        else:
+            language = "Other"
+        return language, gender
+    
+    def get_voice(self, voice_id):
+        """Installed voice with this id, or None"""
+        return self.registry.by_id.get(voice_id)
+    
+    # Speech thread
+    
+    def start_worker(self):
+        with self.worker_lock:
+            if self.worker is None:
+                self.worker = threading.Thread(target=self.worker_loop, name="speech")
+                self.worker.daemon = True
+                self.worker.start()
+    
+    def submit(self, command, *args):
+        """Queue a command for the speech thread and return its Future"""
+        future = Future()
+        with self.worker_lock:
+            self.start_worker()
+            self.commands.put((command, args, future))
+        return future
+    
+    def call(self, command, *args):
+        """Run a command on the speech thread and wait for its result"""
+        if threading.current_thread() is self.worker:
+            return getattr(self, 'run_' + command)(*args)
+        return self.submit(command, *args).result()
+    
+    def worker_loop(self):
+        """Run queued commands one at a time; the only thread that touches the engine"""
+        while True:
+            try:
+                command, args, future = self.commands.get(
+                    timeout=self.VERIFY_IDLE_SECONDS if self.verify_requested else None)
+            except queue.Empty:
+                # Nothing to say for a while: enumerate the voices now
+                self.verify_requested = False
+                try:
+                    self.verify_catalog()
+                except Exception as e:
+                    print(f"Voice catalog error: {str(e)}")
+                continue
+            
+            # Skip commands cancelled while queued
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = getattr(self, 'run_' + command)(*args)
+            except Exception as e:
+                print(f"TTS error: {str(e)}")
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+    
+    def submit_speech(self, command, stop_event, preempt, *args):
+        """Queue speech that stop() can cancel; with preempt, stop what is playing first"""
+        if preempt:
+            self.stop()
+        with self.worker_lock:
+            future = self.submit(command, stop_event, *args)
+            self.speech_jobs[future] = stop_event
+        future.add_done_callback(self.speech_done)
+        return future
+    
+    def speech_done(self, future):
+        with self.worker_lock:
+            self.speech_jobs.pop(future, None)
+    
+    def stop(self):
+        """Cut off the speech playing and cancel the speech queued behind it"""
+        with self.worker_lock:
+            futures = list(self.speech_jobs)
+        for future in futures:
+            self.cancel(future)
+    
+    def cancel(self, future):
+        """Stop one speech job: drop it if queued, cut it off if playing"""
+        with self.worker_lock:
+            stop_event = self.speech_jobs.get(future)
+        if stop_event is not None:
+            stop_event.set()
+            future.cancel()
+    
+    def set_voice(self, voice_id):
+        """Set the active voice; returns a Future done once the engine uses it"""
+        self.current_voice_id = voice_id
+        return self.submit('configure')
+    
+    def set_rate(self, rate):
+        """Set speech rate; returns a Future done once the engine uses it"""
+        self.rate = rate
+        return self.submit('configure')
+    
+    def speak(self, text, voice_id=None, rate=None, preempt=True):
+        """Speak text on the speech thread
+        
+        voice_id and rate override the current settings for this text only.
+        Returns a Future: True when played to the end, False when stopped.
+        """
+        if not text.strip():
+            future = Future()
+            future.set_result(False)
+            return future
+        return self.submit_speech('speak', threading.Event(), preempt, text, voice_id, rate)
+    
+    def speak_chunks(self, chunks, pause_duration=0.0, progress_callback=None, stop_event=None,
+                     preempt=True):
+        """Speak chunks as they are produced; the Future is False if stopped"""
+        return self.submit_speech('speak_chunks', stop_event or threading.Event(), preempt,
+                                  chunks, pause_duration, progress_callback)
+    
+    def save(self, text, path, voice_id=None, rate=None):
+        """Render text to an audio file; the Future holds the path"""
+        return self.submit('save', text, path, voice_id, rate)
+    
+    # Commands, run on the speech thread
+    
+    def run_voices(self):
+        return self.tts_engine.getProperty('voices')
+    
+    def run_configure(self, voice_id=None, rate=None):
+        """Apply the current rate and voice, or the given overrides, to the engine"""
+        self.tts_engine.setProperty('rate', rate or self.rate)
+        
+        voice_id = voice_id or self.current_voice_id
+        if voice_id:
+            self.tts_engine.setProperty('voice', voice_id)
+    
+    def interrupt_on(self, stop_event):
+        """Connect callbacks that cut the engine off mid-utterance once stop_event is set"""
+        def check(name, **kwargs):
+            if stop_event.is_set():
+                # Called inside the engine's loop, on the speech thread
+                self.tts_engine.stop()
+        
+        return [self.tts_engine.connect(topic, check) for topic in ('started-utterance', 'started-word')]
+    
+    def disconnect(self, tokens):
+        for token in tokens:
+            self.tts_engine.disconnect(token)
+    
+    def run_speak(self, stop_event, text, voice_id, rate):
+        if stop_event.is_set():
+            return False
+        
+        self.run_configure(voice_id, rate)
+        tokens = self.interrupt_on(stop_event)
+        try:
+            with metrics.timed('tts_speak_seconds'):
+                self.tts_engine.say(text)
+                self.tts_engine.runAndWait()
+        finally:
+            self.disconnect(tokens)
+        return not stop_event.is_set()
+    
+    def run_save(self, text, path, voice_id, rate):
+        self.run_configure(voice_id, rate)
+        self.tts_engine.save_to_file(text, path)
+        self.tts_engine.runAndWait()
+        return path
+    
+    def run_speak_chunks(self, stop_event, chunks, pause_duration, progress_callback):
+        # A producer thread runs the chunking ahead of playback, and chunks are
+        # fed to one engine loop driven from here (startLoop(False) + iterate),
+        # so the engine is configured once per session and a chunk produced
+        # mid-playback joins the running loop instead of waiting for a new one.
+        # Without a pause chunks are queued back to back; with one, the next
+        # chunk is held until pause_duration after the previous one finished.
+        chunk_queue = queue.Queue()
+        
+        def produce():
+            try:
+                for chunk in chunks:
+                    if stop_event.is_set():
+                        break
+                    if chunk.strip():
+                        chunk_queue.put(chunk)
+            finally:
+                chunk_queue.put(None)
+        
+        producer = threading.Thread(target=produce)
+        producer.daemon = True
+        producer.start()
+        
+        state = {"spoken": 0, "queued": 0, "resume_at": 0.0}
+        
+        def on_finished(name, completed):
+            metrics.increment('tts_chunks_spoken_total')
+            state["spoken"] += 1
+            state["queued"] -= 1
+            if completed:
+                state["resume_at"] = time.perf_counter() + max(0.0, pause_duration)
+            if progress_callback:
+                progress_callback(state["spoken"])
+        
+        self.run_configure()
+        tokens = self.interrupt_on(stop_event)
+        tokens.append(self.tts_engine.connect('finished-utterance', on_finished))
+        started = time.perf_counter()
+        self.tts_engine.startLoop(False)
+        try:
+            next_chunk = None
+            produced_all = False
+            while not stop_event.is_set():
+                can_queue = pause_duration <= 0 or not state["queued"]
+                if next_chunk is None and not produced_all and can_queue:
+                    try:
+                        if state["queued"]:
+                            next_chunk = chunk_queue.get_nowait()
+                        else:
+                            next_chunk = chunk_queue.get(timeout=self.LOOP_INTERVAL)
+                    except queue.Empty:
+                        pass
+                    else:
+                        produced_all = next_chunk is None
+                
+                if next_chunk is not None and time.perf_counter() >= state["resume_at"]:
+                    state["queued"] += 1
+                    self.tts_engine.say(next_chunk)
+                    next_chunk = None
+                
+                if state["queued"]:
+                    self.tts_engine.iterate()
+                    stop_event.wait(self.LOOP_INTERVAL)
+                elif produced_all:
+                    break
+                elif next_chunk is not None:
+                    # The pause: nothing is queued on the engine
+                    pause_left = state["resume_at"] - time.perf_counter()
+                    stop_event.wait(max(0.0, min(self.LOOP_INTERVAL, pause_left)))
+        finally:
+            if stop_event.is_set():
+                # Drop what is still queued on the engine
+                self.tts_engine.stop()
+            self.tts_engine.endLoop()
+            self.disconnect(tokens)
+            metrics.observe('tts_session_seconds', time.perf_counter() - started)
+        
+        return not stop_event.is_set()
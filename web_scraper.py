@@ -1,38 +1,168 @@
-# web_scraper.py
-import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urlparse
-
-class WebScraper:
-    """Handles web page content extraction"""
-    
-    @staticmethod
-    def is_url(text):
-        """Check if text is a valid URL"""
-        try:
-            result = urlparse(text)
-            return all([result.scheme, result.netloc])
-        except:
-            return False
-    
-    @staticmethod
-    def get_text_from_url(url):
-        """Extract text content from URL"""
-        try:
-            response = requests.get(url)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Try to get main content
-            main_content = soup.find('main') or soup.find('article') or soup.find('div', class_='content')
-            
-            if main_content:
-                text = ' '.join(main_content.stripped_strings)
-            else:
-                # Fallback to body content
-                text = ' '.join(soup.body.stripped_strings)
-                
-            return True, text
-        except requests.exceptions.RequestException as e:
-            return False, f"Error loading URL: {str(e)}"
-
+# web_scraper.py
+import hashlib
+import json
+import os
+from urllib.parse import urlparse
+from app_paths import get_cache_dir
+from cache_limiter import CacheLimiter
+from content_extractor import ContentExtractor
+from single_flight import SingleFlight
+from metrics import metrics
+
+class WebScraper:
+    """Handles web page content extraction"""
+    
+    # (connect, read) timeouts in seconds
+    TIMEOUT = (5, 20)
+    
+    def __init__(self, cache_dir=None, extractor_backend=None, cache_max_bytes=200 * 1024 * 1024,
+                 cache_max_age=30 * 24 * 3600):
+        self.cache_dir = cache_dir or get_cache_dir('pages')
+        # Pages least recently fetched are evicted first
+        self.cache_limiter = CacheLimiter(self.cache_dir, cache_max_bytes, cache_max_age)
+        self.extractor = ContentExtractor(extractor_backend)
+        self.single_flight = SingleFlight('web')
+        
+        # requests is imported and the session created on first fetch
+        self._session = None
+    
+    @property
+    def session(self):
+        """Shared HTTP session, created on first use"""
+        if self._session is None:
+            self._session = self.create_session()
+        return self._session
+    
+    def warm_up(self):
+        """Import the HTTP and HTML parsing libraries ahead of the first fetch"""
+        self.session
+        self.extractor.warm_up()
+    
+    @staticmethod
+    def create_session():
+        """Create a pooled HTTP session with retries and compression"""
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+        
+        session = requests.Session()
+        
+        retry = Retry(total=3, backoff_factor=0.5,
+                      status_forcelist=(429, 500, 502, 503, 504),
+                      allowed_methods=frozenset(['GET', 'HEAD']),
+                      respect_retry_after_header=True)
+        adapter = HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=retry)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        
+        # urllib3 only decodes brotli when a brotli package is installed
+        encodings = 'gzip, deflate'
+        try:
+            import brotli  # noqa: F401
+            encodings += ', br'
+        except ImportError:
+            try:
+                import brotlicffi  # noqa: F401
+                encodings += ', br'
+            except ImportError:
+                pass
+        
+        session.headers.update({
+            'Accept-Encoding': encodings,
+            'User-Agent': 'Mozilla/5.0 (compatible; VietnameseAIAssistant/1.0)',
+        })
+        return session
+    
+    @staticmethod
+    def is_url(text):
+        """Check if text is a valid URL"""
+        try:
+            result = urlparse(text)
+            return all([result.scheme, result.netloc])
+        except:
+            return False
+    
+    def cache_paths(self, url):
+        """Return (metadata, body) cache file paths for url"""
+        digest = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        base = os.path.join(self.cache_dir, digest)
+        return base + '.json', base + '.html'
+    
+    def load_cached_page(self, url):
+        """Load cached validators and body for url, or (None, None)"""
+        meta_path, body_path = self.cache_paths(url)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(body_path, 'rb') as f:
+                body = f.read()
+            return meta, body
+        except (OSError, ValueError):
+            return None, None
+    
+    def store_page(self, url, response):
+        """Cache a response body when the server sent revalidation headers"""
+        meta = {
+            'url': url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+        }
+        if not meta['etag'] and not meta['last_modified']:
+            return
+        
+        meta_path, body_path = self.cache_paths(url)
+        try:
+            # Write body first and swap files in atomically
+            with open(body_path + '.tmp', 'wb') as f:
+                f.write(response.content)
+            os.replace(body_path + '.tmp', body_path)
+            
+            with open(meta_path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+            os.replace(meta_path + '.tmp', meta_path)
+        except OSError as e:
+            print(f"Error caching page: {str(e)}")
+            return
+        
+        self.cache_limiter.added(len(response.content) + os.path.getsize(meta_path))
+    
+    def fetch(self, url):
+        """Fetch page bytes, revalidating a cached copy with a conditional GET"""
+        meta, body = self.load_cached_page(url)
+        
+        headers = {}
+        if meta:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+        
+        with metrics.timed('web_fetch_seconds'):
+            response = self.session.get(url, headers=headers, timeout=self.TIMEOUT)
+        
+        if response.status_code == 304 and body is not None:
+            metrics.increment('web_not_modified_total')
+            self.cache_limiter.touch(*self.cache_paths(url))
+            return body
+        
+        response.raise_for_status()
+        self.store_page(url, response)
+        return response.content
+    
+    def get_text_from_url(self, url):
+        """Extract text content from URL"""
+        # Concurrent requests for the same URL share one download and parse
+        return self.single_flight.do(url, self.load_text, url)
+    
+    def load_text(self, url):
+        """Fetch url and extract its text, returning (success, text or error)"""
+        import requests
+        
+        try:
+            content = self.fetch(url)
+            with metrics.timed('web_extract_seconds'):
+                text = self.extractor.extract(content)
+            return True, text
+        except requests.exceptions.RequestException as e:
+            metrics.increment('web_errors_total')
+            return False, f"Error loading URL: {str(e)}"